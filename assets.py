@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Asset:
+    def __init__(self, name, body, immutable):
+        self.name = name
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self._digest = hashlib.sha256(body).hexdigest()[:16]
+        self.immutable = immutable
+        self.encodings = {'identity': body}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.encodings['gzip'] = compressed
+        if brotli:
+            compressed = brotli.compress(body)
+            if len(compressed) < len(body):
+                self.encodings['br'] = compressed
+
+    def select(self, accept_encoding):
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encodings and encoding in accepted:
+                return encoding, self.encodings[encoding]
+        return 'identity', self.encodings['identity']
+
+    def etag(self, encoding):
+        # Each encoding is a different representation, so each gets its own tag.
+        suffix = _ETAG_SUFFIXES.get(encoding, '')
+        return f'"{self._digest}{suffix}"'
+
+    def matches(self, if_none_match, encoding):
+        etag = self.etag(encoding)
+        for tag in (if_none_match or '').split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == '*' or tag == etag:
+                return True
+        return False
+
+    def headers(self, encoding):
+        headers = {'ETag': self.etag(encoding), 'Vary': 'Accept-Encoding'}
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        if self.immutable:
+            headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            headers['Cache-Control'] = 'no-cache'
+        return headers
+
+
+class Assets:
+    def __init__(self, directory, index='index.html', inline=False):
+        self._assets = {}
+        sources = {}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    sources[name] = f.read()
+        html = sources.pop(index).decode()
+        if inline:
+            html = _inline(html, sources)
+        for name, body in sources.items():
+            fingerprinted = _fingerprint(name, body)
+            self._assets[fingerprinted] = Asset(fingerprinted, body, True)
+            html = re.sub(r'(\b(?:href|src)=")' + re.escape(name) + '"',
+                          lambda m: m.group(1) + fingerprinted + '"', html)
+        self._assets[index] = Asset(index, html.encode(), False)
+        self.index = self._assets[index]
+
+    def get(self, name):
+        return self._assets.get(name)
+
+    def names(self):
+        return list(self._assets)
+
+
+_ETAG_SUFFIXES = {'gzip': '-gz', 'br': '-br'}
+
+
+def _fingerprint(name, body):
+    base, ext = os.path.splitext(name)
+    return f'{base}.{hashlib.sha256(body).hexdigest()[:10]}{ext}'
+
+
+def _inline(html, sources):
+    def style(match):
+        try:
+            return '<style>' + sources[match.group(1)].decode() + '</style>'
+        except KeyError:
+            return match.group(0)
+
+    def script(match):
+        try:
+            return '<script>' + sources[match.group(1)].decode() + '</script>'
+        except KeyError:
+            return match.group(0)
+
+    html = re.sub(r'<link rel="stylesheet" href="([^"]+)">', style, html)
+    return re.sub(r'<script src="([^"]+)"></script>', script, html)
+
+
+def _parse_accept_encoding(header):
+    accepted = set()
+    for item in (header or '').split(','):
+        encoding, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if encoding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(encoding.lower())
+    return accepted
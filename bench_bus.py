@@ -0,0 +1,53 @@
+import bus
+import dbus_next
+import io
+import sys
+import time
+from dbus_next._private.unmarshaller import Unmarshaller
+
+
+def scan_traffic(count):
+    messages = []
+    for i in range(count):
+        path = f'/org/bluez/hci0/dev_{i % 200:012X}'
+        if i % 10:
+            changed = {
+                'RSSI': dbus_next.Variant('n', -40 - i % 50),
+                'ManufacturerData': dbus_next.Variant('a{qv}', {76: dbus_next.Variant('ay', bytes(range(i % 7, i % 7 + 25)))})
+            }
+        else:
+            changed = {'Connected': dbus_next.Variant('b', bool(i % 20))}
+        messages.append(dbus_next.Message.new_signal(path, 'org.freedesktop.DBus.Properties', 'PropertiesChanged',
+                                                     'sa{sv}as', ['org.bluez.Device1', changed, []]))
+    return b''.join(m._marshall() for m in messages)
+
+
+def accept(path, interface, member, arg0):
+    if member == 'PropertiesChanged' and arg0 == 'org.bluez.Device1':
+        return {'Connected'}
+    return False
+
+
+def run(data, create_unmarshaller):
+    stream = io.BytesIO(data)
+    start = time.process_time()
+    decoded = 0
+    while True:
+        try:
+            if create_unmarshaller(stream).unmarshall():
+                decoded += 1
+        except EOFError:
+            break
+    return time.process_time() - start, decoded
+
+
+def main(count=50000):
+    data = scan_traffic(count)
+    for name, create in [('full decode', lambda s: Unmarshaller(s)),
+                         ('header filter', lambda s: bus.SignalFilteringUnmarshaller(s, None, accept))]:
+        elapsed, decoded = run(data, create)
+        print(f'{name}: {count / elapsed:.0f} messages/sec/core, {decoded} decoded')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,99 @@
+import json
+import random
+import shutil
+import subprocess
+import sys
+import time
+import wire
+import zlib
+
+# Compares the /ws encodings on a storm of single device state changes:
+#
+#     python3 bench_wire.py [devices] [updates]
+#
+# Compressed sizes follow permessage-deflate with context takeover, which is
+# what browsers negotiate. Client decode cost is measured by running
+# static/devices.js under node when it is installed.
+
+
+def updates(device_count, count):
+    random.seed(1)
+    devices = [{'name': f'Controller {i}', 'address': f'00:11:22:33:{i // 256:02X}:{i % 256:02X}',
+                'state': 'disconnected', 'in_range': False} for i in range(device_count)]
+    frames = [devices]
+    for _ in range(count):
+        devices = [dict(d) for d in devices]
+        device = random.choice(devices)
+        device['state'] = random.choice(wire.STATES)
+        device['in_range'] = random.random() < 0.8
+        frames.append(devices)
+    return frames
+
+
+def encode(encoder, frames):
+    return [m for m in map(encoder.encode, frames) if m is not None]
+
+
+def deflated_sizes(messages):
+    compressor = zlib.compressobj(wbits=-15)
+    sizes = []
+    for message in messages:
+        data = message.encode() if isinstance(message, str) else message
+        sizes.append(len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4)
+    return sizes
+
+
+def python_decode_seconds(name, messages):
+    decoder = wire.Decoder()
+    decode = json.loads if name == 'json' else decoder.decode
+    start = time.process_time()
+    for message in messages:
+        decode(message)
+    return time.process_time() - start
+
+
+_NODE_BENCH = '''
+global.document = {addEventListener: function() {}};
+global.window = {};
+global.TextDecoder = require('util').TextDecoder;
+eval(require('fs').readFileSync(process.argv[1], 'utf8'));
+var input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+var binary = input.binary.map(function(hex) { return new Uint8Array(Buffer.from(hex, 'hex')); });
+var start = process.hrtime.bigint();
+input.json.forEach(function(text) { JSON.parse(text); });
+var json_ns = process.hrtime.bigint() - start;
+start = process.hrtime.bigint();
+binary.forEach(decode_frame);
+var binary_ns = process.hrtime.bigint() - start;
+console.log(JSON.stringify({json: Number(json_ns) / 1e9, binary: Number(binary_ns) / 1e9}));
+'''
+
+
+def node_decode_seconds(encoded):
+    node = shutil.which('node')
+    if not node:
+        return None
+    payload = json.dumps({'json': encoded['json'], 'binary': [m.hex() for m in encoded['binary']]})
+    result = subprocess.run([node, '-e', _NODE_BENCH, 'static/devices.js'], input=payload,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main(device_count=20, count=20000):
+    frames = updates(device_count, count)
+    encoded = {'json': encode(wire.JsonEncoder(), frames), 'binary': encode(wire.BinaryEncoder(), frames)}
+    client = node_decode_seconds(encoded)
+    for name, messages in encoded.items():
+        plain = sum(len(m) for m in messages[1:]) / (len(messages) - 1)
+        deflated = sum(deflated_sizes(messages)[1:]) / (len(messages) - 1)
+        python_seconds = python_decode_seconds(name, messages)
+        print(f'{name}: first frame {len(messages[0])} bytes, {plain:.1f} bytes/update, '
+              f'{deflated:.1f} bytes/update deflated, '
+              f'python decode {python_seconds / len(messages) * 1e6:.2f} us/message', end='')
+        if client:
+            print(f', devices.js decode {client[name] / len(messages) * 1e6:.2f} us/message', end='')
+        print()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
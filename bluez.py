@@ -1,4 +1,7 @@
+import contextlib
 import dbus_next
+import dbus_next.service
+import time
 
 
 async def connect(bus, listener):
@@ -9,11 +12,14 @@ async def connect(bus, listener):
                    member='AddMatch',
                    signature='s',
                    body=["type='signal',sender='org.bluez',path_namespace='/'"])
+    start = time.perf_counter()
     reply = await bus.call(destination='org.bluez',
                            path='/',
                            interface='org.freedesktop.DBus.ObjectManager',
                            member='GetManagedObjects')
     client._init_objects(reply[0])
+    client.startup_objects = len(reply[0])
+    client.startup_seconds = time.perf_counter() - start
     return client
 
 
@@ -21,8 +27,12 @@ class BluezClient:
     def __init__(self, bus, listener):
         self._bus = bus
         self._listener = listener
-        self._adapter = None
+        self._adapters = {}
         self._devices = {}
+        self._device_flags = {}
+        self._watched = set()
+        self.startup_objects = 0
+        self.startup_seconds = 0
         self._handlers = {
             'org.freedesktop.DBus.ObjectManager': {
                 'InterfacesAdded': self._interfaces_added,
@@ -32,11 +42,28 @@ class BluezClient:
                 'PropertiesChanged': self._properties_changed
             }
         }
-        bus.add_message_handler(self._handle_message)
+        bus.add_message_handler(self._handle_message, self._accept_signal)
     
     def disconnect(self):
         self._bus.remove_message_handler(self._handle_message)
 
+    def get_address(self, path):
+        return self._devices.get(path)
+
+    def get_object_count(self):
+        return len(self._adapters) + len(self._devices)
+
+    def get_stale_devices(self, keep):
+        stale = []
+        for path, address in self._devices.items():
+            flags = self._device_flags[path]
+            if address in keep or flags['Paired'] or flags['Connected']:
+                continue
+            adapter = self._adapters.get(path.rsplit('/', 1)[0])
+            if adapter:
+                stale.append((adapter, Device(self._bus, path)))
+        return stale
+
     def _init_objects(self, tree):
         for path, interfaces in tree.items():
             self._check_added_adapters(path, interfaces)
@@ -49,16 +76,36 @@ class BluezClient:
             return
         handler(path, body)
 
+    def _accept_signal(self, path, interface, member, arg0):
+        if interface == 'org.freedesktop.DBus.ObjectManager':
+            return member in self._handlers[interface]
+        if interface == 'org.freedesktop.DBus.Properties' and member == 'PropertiesChanged':
+            if arg0 == 'org.bluez.Device1' and path in self._watched:
+                return _WATCHED_DEVICE_PROPERTIES
+            if arg0 == 'org.bluez.Device1' and path in self._devices:
+                return _DEVICE_PROPERTIES
+            if arg0 == 'org.bluez.Adapter1' and path in self._adapters:
+                return _ADAPTER_PROPERTIES
+        return False
+
     def _interfaces_added(self, _, body):
         self._check_added_adapters(*body)
         self._check_added_devices(*body)
 
     def _check_added_adapters(self, path, interfaces):
         try:
-            interfaces['org.bluez.Adapter1']
+            interface = interfaces['org.bluez.Adapter1']
         except KeyError:
             return
-        self._listener.add_adapter(Adapter(self._bus, path))
+        if path not in self._adapters:
+            adapter = self._adapters[path] = Adapter(self._bus, path)
+            self._listener.add_adapter(adapter)
+            self._update_adapter(adapter, interface)
+
+    def _update_adapter(self, adapter, changed):
+        properties = {name: changed[name].value for name in _ADAPTER_PROPERTIES if name in changed}
+        if properties:
+            self._listener.update_adapter(adapter, properties)
 
     def _check_added_devices(self, path, interfaces):
         try:
@@ -68,17 +115,32 @@ class BluezClient:
         except KeyError:
             return
         if path not in self._devices:
+            paired = interface.get('Paired', _FALSE).value
             self._devices[path] = address
+            self._device_flags[path] = {'Paired': paired, 'Connected': connected}
+            if self._listener.accepts_pairing(address):
+                self._watched.add(path)
             self._listener.add_device(address, Device(self._bus, path), connected)
+            self._listener.update_paired(address, paired)
+            if 'RSSI' in interface:
+                self._listener.device_seen(address, interface['RSSI'].value)
 
     def _interfaces_removed(self, _, body):
         path, interfaces = body
+        if 'org.bluez.Adapter1' in interfaces:
+            try:
+                adapter = self._adapters.pop(path)
+            except KeyError:
+                return
+            self._listener.remove_adapter(adapter)
         if 'org.bluez.Device1' in interfaces:
             try:
                 address = self._devices[path]
             except KeyError:
                 return
             del self._devices[path]
+            del self._device_flags[path]
+            self._watched.discard(path)
             self._listener.remove_device(address)
 
     def _properties_changed(self, path, body):
@@ -86,10 +148,31 @@ class BluezClient:
         if interface == 'org.bluez.Device1':
             try:
                 address = self._devices[path]
-                connected = changed['Connected'].value
+                flags = self._device_flags[path]
+            except KeyError:
+                return
+            if 'Paired' in changed:
+                flags['Paired'] = changed['Paired'].value
+                self._listener.update_paired(address, flags['Paired'])
+            if 'Connected' in changed:
+                flags['Connected'] = changed['Connected'].value
+                self._listener.update_device(address, flags['Connected'])
+            if 'RSSI' in changed and path in self._watched:
+                self._listener.device_seen(address, changed['RSSI'].value)
+        elif interface == 'org.bluez.Adapter1':
+            try:
+                adapter = self._adapters[path]
             except KeyError:
                 return
-            self._listener.update_device(address, connected)
+            self._update_adapter(adapter, changed)
+
+
+_DEVICE_PROPERTIES = frozenset(['Connected', 'Paired'])
+# RSSI updates arrive with every advertisement, so they are only decoded for
+# configured devices.
+_WATCHED_DEVICE_PROPERTIES = _DEVICE_PROPERTIES | {'RSSI'}
+_FALSE = dbus_next.Variant('b', False)
+_ADAPTER_PROPERTIES = frozenset(['Powered', 'Discovering', 'Discoverable'])
 
 
 class _Listener:
@@ -116,6 +199,14 @@ class Adapter:
     async def start_discovery(self):
         await self._call(member='StartDiscovery')
 
+    async def set_powered(self, powered):
+        await self._bus.call(destination='org.bluez',
+                             path=self.path,
+                             interface='org.freedesktop.DBus.Properties',
+                             member='Set',
+                             signature='ssv',
+                             body=['org.bluez.Adapter1', 'Powered', dbus_next.Variant('b', powered)])
+
     async def stop_discovery(self):
         await self._call(member='StopDiscovery')
 
@@ -153,3 +244,94 @@ class Device:
                              path=self.path,
                              interface='org.bluez.Device1',
                              **kwargs)
+
+
+class Agent(dbus_next.service.ServiceInterface):
+    def __init__(self, bus, client, listener, capability='NoInputNoOutput', path='/bluerepair/agent'):
+        super().__init__('org.bluez.Agent1')
+        self._bus = bus
+        self._client = client
+        self._listener = listener
+        self._capability = capability
+        self.path = path
+        self._stats = {}
+
+    async def register(self):
+        self._bus.export(self.path, self)
+        await self._call(member='RegisterAgent', signature='os', body=[self.path, self._capability])
+        await self._call(member='RequestDefaultAgent', signature='o', body=[self.path])
+
+    async def unregister(self):
+        await self._call(member='UnregisterAgent', signature='o', body=[self.path])
+        self._bus.unexport(self.path)
+
+    def get_stats(self):
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    @dbus_next.service.method(name='Release')
+    def release(self):
+        pass
+
+    @dbus_next.service.method(name='RequestPinCode')
+    def request_pin_code(self, device: 'o') -> 's':
+        with self._authorize('RequestPinCode', device):
+            return '0000'
+
+    @dbus_next.service.method(name='DisplayPinCode')
+    def display_pin_code(self, device: 'o', pincode: 's'):
+        with self._authorize('DisplayPinCode', device):
+            pass
+
+    @dbus_next.service.method(name='RequestPasskey')
+    def request_passkey(self, device: 'o') -> 'u':
+        with self._authorize('RequestPasskey', device):
+            return 0
+
+    @dbus_next.service.method(name='DisplayPasskey')
+    def display_passkey(self, device: 'o', passkey: 'u', entered: 'q'):
+        with self._authorize('DisplayPasskey', device):
+            pass
+
+    @dbus_next.service.method(name='RequestConfirmation')
+    def request_confirmation(self, device: 'o', passkey: 'u'):
+        with self._authorize('RequestConfirmation', device):
+            pass
+
+    @dbus_next.service.method(name='RequestAuthorization')
+    def request_authorization(self, device: 'o'):
+        with self._authorize('RequestAuthorization', device):
+            pass
+
+    @dbus_next.service.method(name='AuthorizeService')
+    def authorize_service(self, device: 'o', uuid: 's'):
+        with self._authorize('AuthorizeService', device):
+            pass
+
+    @dbus_next.service.method(name='Cancel')
+    def cancel(self):
+        self._stats_for('Cancel')['count'] += 1
+
+    @contextlib.contextmanager
+    def _authorize(self, name, device):
+        stats = self._stats_for(name)
+        stats['count'] += 1
+        start = time.perf_counter()
+        try:
+            address = self._client.get_address(device)
+            if not address or not self._listener.accepts_pairing(address):
+                stats['rejected'] += 1
+                raise dbus_next.DBusError('org.bluez.Error.Rejected', f'{device} is not a configured device')
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+
+    def _stats_for(self, name):
+        return self._stats.setdefault(name, {'count': 0, 'rejected': 0, 'total': 0, 'max': 0})
+
+    async def _call(self, **kwargs):
+        await self._bus.call(destination='org.bluez',
+                             path='/org/bluez',
+                             interface='org.bluez.AgentManager1',
+                             **kwargs)
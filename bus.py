@@ -1,24 +1,45 @@
 import dbus_next
+import logging
+from dbus_next._private.constants import HeaderField, LITTLE_ENDIAN, BIG_ENDIAN, PROTOCOL_VERSION
+from dbus_next._private.unmarshaller import Unmarshaller, MarshallerStreamEndError
+
+logger = logging.getLogger(__name__)
+
+# Signal filtering replaces the unmarshaller through these MessageBus
+# internals, which are only known to exist in dbus_next 0.2.3.
+_PRIVATE_ATTRIBUTES = ['_create_unmarshaller', '_stream', '_sock', '_negotiate_unix_fd']
 
 
 class Bus:
     def __init__(self):
         self._bus = dbus_next.aio.MessageBus(bus_type=dbus_next.BusType.SYSTEM)
-        self._handlers = set()
+        self._handlers = {}
+        missing = [a for a in _PRIVATE_ATTRIBUTES if not hasattr(self._bus, a)]
+        if missing:
+            logger.warning('dbus_next MessageBus has no %s, signals will not be filtered', ', '.join(missing))
+            return
+        self._bus._create_unmarshaller = self._create_unmarshaller
+        self._bus._unmarshaller = self._create_unmarshaller()
 
     async def connect(self):
         await self._bus.connect()
         self._bus.add_message_handler(self._handle_message)
-    
+
     def disconnect(self):
         self._bus.remove_message_handler(self._handle_message)
         self._bus.disconnect()
 
-    def add_message_handler(self, handler):
-        self._handlers.add(handler)
+    def add_message_handler(self, handler, accept=None):
+        self._handlers[handler] = accept
 
     def remove_message_handler(self, handler):
-        self._handlers.remove(handler)
+        del self._handlers[handler]
+
+    def export(self, path, interface):
+        self._bus.export(path, interface)
+
+    def unexport(self, path):
+        self._bus.unexport(path)
 
     async def call(self, **kwargs):
         msg = dbus_next.Message(**kwargs)
@@ -28,5 +49,134 @@ class Bus:
         return reply.body
 
     def _handle_message(self, msg):
-        for handler in self._handlers:
+        for handler in list(self._handlers):
             handler(msg.path, msg.interface, msg.member, msg.body)
+
+    def _accept_signal(self, path, interface, member, arg0):
+        properties = set()
+        for accept in self._handlers.values():
+            result = True if accept is None else accept(path, interface, member, arg0)
+            if result is True:
+                return True
+            if result:
+                properties.update(result)
+        return properties or False
+
+    def _create_unmarshaller(self):
+        sock = self._bus._sock if self._bus._negotiate_unix_fd else None
+        return SignalFilteringUnmarshaller(self._bus._stream, sock, self._accept_signal)
+
+
+class SignalFilteringUnmarshaller(Unmarshaller):
+    # Decodes the header of each message and, for signals, asks accept(path,
+    # interface, member, arg0) whether the body is needed. accept returns True,
+    # False, or a set of property names that must appear in a PropertiesChanged
+    # signal. Rejected signals are dropped without decoding their bodies.
+    def __init__(self, stream, sock, accept):
+        super().__init__(stream, sock)
+        self._accept = accept
+        self.dropped = 0
+
+    def unmarshall(self):
+        while True:
+            try:
+                self._unmarshall()
+            except MarshallerStreamEndError:
+                return None
+            if self.message:
+                return self.message
+            self.dropped += 1
+            self.buf = bytearray()
+            self.offset = 0
+            self.unix_fds = []
+
+    def _unmarshall(self):
+        self.offset = 0
+        self.message = None
+        self.read(16, prefetch=True)
+        self.endian = self.read_byte()
+        if self.endian != LITTLE_ENDIAN and self.endian != BIG_ENDIAN:
+            raise dbus_next.InvalidMessageError('Expecting endianness as the first byte')
+        message_type = dbus_next.MessageType(self.read_byte())
+        flags = dbus_next.MessageFlag(self.read_byte())
+
+        protocol_version = self.read_byte()
+        if protocol_version != PROTOCOL_VERSION:
+            raise dbus_next.InvalidMessageError(f'got unknown protocol version: {protocol_version}')
+
+        body_len = self.read_uint32()
+        serial = self.read_uint32()
+
+        header_len = self.read_uint32()
+        msg_len = header_len + self._padding(header_len, 8) + body_len
+        self.read(msg_len, prefetch=True)
+        self.offset -= 4
+
+        header_fields = {}
+        for field_struct in self.read_argument(_HEADER_TYPE):
+            header_fields[HeaderField(field_struct[0]).name] = field_struct[1].value
+        self.align(8)
+
+        path = header_fields.get(HeaderField.PATH.name)
+        interface = header_fields.get(HeaderField.INTERFACE.name)
+        member = header_fields.get(HeaderField.MEMBER.name)
+        signature_tree = dbus_next.SignatureTree._get(header_fields.get(HeaderField.SIGNATURE.name, ''))
+
+        if message_type == dbus_next.MessageType.SIGNAL and interface != 'org.freedesktop.DBus':
+            if not self._wanted(path, interface, member, signature_tree, body_len):
+                return
+
+        body = []
+        if body_len:
+            for type_ in signature_tree.types:
+                body.append(self.read_argument(type_))
+
+        self.message = dbus_next.Message(destination=header_fields.get(HeaderField.DESTINATION.name),
+                                         path=path,
+                                         interface=interface,
+                                         member=member,
+                                         message_type=message_type,
+                                         flags=flags,
+                                         error_name=header_fields.get(HeaderField.ERROR_NAME.name),
+                                         reply_serial=header_fields.get(HeaderField.REPLY_SERIAL.name),
+                                         sender=header_fields.get(HeaderField.SENDER.name),
+                                         unix_fds=self.unix_fds,
+                                         signature=signature_tree,
+                                         body=body,
+                                         serial=serial)
+
+    def _wanted(self, path, interface, member, signature_tree, body_len):
+        start = self.offset
+        arg0 = None
+        if body_len and signature_tree.signature[:1] in ('s', 'o'):
+            arg0 = self.read_string()
+        accepted = self._accept(path, interface, member, arg0)
+        if accepted is not True and accepted and signature_tree.signature == 'sa{sv}as':
+            accepted = not accepted.isdisjoint(self._read_property_names())
+        self.offset = start
+        return bool(accepted)
+
+    def _read_property_names(self):
+        self.align(4)
+        array_length = self.read_uint32()
+        self.align(8)
+        end = self.offset + array_length
+        names = set()
+        while self.offset < end:
+            self.align(8)
+            names.add(self.read_string())
+            self._skip_argument(dbus_next.SignatureTree._get(self.read_signature()).types[0])
+        return names
+
+    def _skip_argument(self, type_):
+        if type_.token != 'a':
+            self.read_argument(type_)
+            return
+        self.align(4)
+        array_length = self.read_uint32()
+        if type_.children[0].token in 'xtd{(':
+            self.align(8)
+        self.offset += array_length
+
+
+_HEADER_TYPE = dbus_next.SignatureTree._get('a(yv)').types[0]
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import bluez
+import bus
+import config
+import device_manager
+import json
+import sys
+
+OK = 0
+FAILED = 1
+TIMED_OUT = 2
+UNKNOWN_DEVICE = 3
+
+_TARGET_STATES = {'connect': 'connected', 'disconnect': 'disconnected'}
+
+
+async def run(manager, command, addresses, timeout, emit):
+    known = {d['address']: d for d in manager.get_devices()}
+    if command == 'status':
+        results = {}
+        for address in addresses or list(known):
+            if address in known:
+                emit(dict(known[address], event='status'))
+                results[address] = OK
+            else:
+                emit({'event': 'result', 'address': address, 'code': UNKNOWN_DEVICE, 'error': 'unknown device'})
+                results[address] = UNKNOWN_DEVICE
+        return results
+
+    with manager.subscribe() as queue:
+        progress = asyncio.ensure_future(_report_progress(queue, set(addresses), emit))
+        try:
+            codes = await asyncio.gather(*(_run_one(manager, command, address, known, timeout, emit)
+                                           for address in addresses))
+        finally:
+            progress.cancel()
+    return dict(zip(addresses, codes))
+
+
+async def _run_one(manager, command, address, known, timeout, emit):
+    if address not in known:
+        emit({'event': 'result', 'address': address, 'code': UNKNOWN_DEVICE, 'error': 'unknown device'})
+        return UNKNOWN_DEVICE
+    target = _TARGET_STATES[command]
+    with manager.subscribe() as queue:
+        try:
+            await asyncio.wait_for(_operate(manager, command, address, target, queue), timeout)
+        except asyncio.TimeoutError:
+            code, error = TIMED_OUT, 'timed out'
+        except Exception as e:
+            code, error = FAILED, str(e)
+        else:
+            code, error = OK, None
+    if code == OK and _state(manager, address) != target:
+        code, error = FAILED, f'device is {_state(manager, address)}'
+    result = {'event': 'result', 'address': address, 'code': code, 'state': _state(manager, address)}
+    if error:
+        result['error'] = error
+    emit(result)
+    return code
+
+
+async def _operate(manager, command, address, target, queue):
+    await getattr(manager, command)(address)
+    while _state(manager, address) in ('connecting', 'disconnecting'):
+        await queue.get()
+
+
+async def _report_progress(queue, addresses, emit):
+    states = {}
+    while True:
+        for device in await queue.get():
+            address = device['address']
+            if address in addresses and states.get(address) != device['state']:
+                states[address] = device['state']
+                emit(dict(device, event='state'))
+
+
+def _state(manager, address):
+    return next(d['state'] for d in manager.get_devices() if d['address'] == address)
+
+
+def _emit(message):
+    print(json.dumps(message), flush=True)
+
+
+async def _main(args):
+    app_config = config.Config()
+    manager = device_manager.DeviceManager(app_config.get_devices(),
+                                           device_manager.Timeout(args.adapter_timeout),
+                                           device_manager.Timeout(args.scan_timeout),
+                                           auto_power_on=app_config.get_auto_power_on(),
+                                           presence_ttl=app_config.get_presence_ttl(),
+                                           scan_window=app_config.get_scan_window(),
+                                           scan_interval=app_config.get_scan_interval())
+    system_bus = bus.Bus()
+    await system_bus.connect()
+    client = await bluez.connect(system_bus, manager)
+    agent = bluez.Agent(system_bus, client, manager, app_config.get_agent_capability())
+    await agent.register()
+    try:
+        return await run(manager, args.command, args.addresses, args.timeout, _emit)
+    finally:
+        try:
+            await agent.unregister()
+        except RuntimeError:
+            pass
+        client.disconnect()
+        system_bus.disconnect()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cli',
+                                     description='Repair, disconnect or inspect configured devices without the web server.')
+    parser.add_argument('command', choices=['connect', 'disconnect', 'status'])
+    parser.add_argument('addresses', nargs='*', help='device addresses (status defaults to all configured devices)')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for each device')
+    parser.add_argument('--scan-timeout', type=float, default=20)
+    parser.add_argument('--adapter-timeout', type=float, default=20)
+    args = parser.parse_args(argv)
+    if args.command != 'status' and not args.addresses:
+        parser.error(f'{args.command} needs at least one address')
+    results = asyncio.run(_main(args))
+    return max(results.values(), default=OK)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,78 @@
-from strictyaml import load, Map, Seq, Str
+import socket
+from strictyaml import load, Bool, Enum, Float, Int, Map, Optional, Seq, Str
 
 
 class Config:
-    def __init__(self):
-        schema = Map({'devices': Seq(Map({'name': Str(), 'address': Str()}))})
-        with open('config.yaml') as f:
+    def __init__(self, path='config.yaml'):
+        schema = Map({
+            'devices': Seq(Map({
+                'name': Str(),
+                'address': Str(),
+                Optional('reconnect', default=False): Bool()
+            })),
+            Optional('inline_assets', default=False): Bool(),
+            Optional('journal_capacity', default=1024): Int(),
+            Optional('journal_path'): Str(),
+            Optional('debug_profile', default=False): Bool(),
+            Optional('auto_power_on', default=False): Bool(),
+            Optional('prune_devices', default=False): Bool(),
+            Optional('presence_ttl', default=30): Int(),
+            Optional('scan_window', default=5): Int(),
+            Optional('scan_interval', default=30): Int(),
+            Optional('websocket_compression', default=False): Bool(),
+            Optional('peer'): Map({
+                Optional('name'): Str(),
+                Optional('host', default='0.0.0.0'): Str(),
+                Optional('port', default=7531): Int(),
+                'peers': Seq(Str()),
+                Optional('interval', default=1): Float(),
+                Optional('lease_seconds', default=30): Int()
+            }),
+            Optional('agent_capability', default='NoInputNoOutput'): Enum([
+                'DisplayOnly', 'DisplayYesNo', 'KeyboardOnly', 'NoInputNoOutput', 'KeyboardDisplay'
+            ])
+        })
+        with open(path) as f:
             self._config = load(f.read(), schema).data
 
     def get_devices(self):
         return self._config['devices']
+
+    def get_inline_assets(self):
+        return self._config['inline_assets']
+
+    def get_journal_capacity(self):
+        return self._config['journal_capacity']
+
+    def get_journal_path(self):
+        return self._config.get('journal_path')
+
+    def get_debug_profile(self):
+        return self._config['debug_profile']
+
+    def get_auto_power_on(self):
+        return self._config['auto_power_on']
+
+    def get_agent_capability(self):
+        return self._config['agent_capability']
+
+    def get_prune_devices(self):
+        return self._config['prune_devices']
+
+    def get_presence_ttl(self):
+        return self._config['presence_ttl']
+
+    def get_scan_window(self):
+        return self._config['scan_window']
+
+    def get_scan_interval(self):
+        return self._config['scan_interval']
+
+    def get_websocket_compression(self):
+        return self._config['websocket_compression']
+
+    def get_peer(self):
+        peer = self._config.get('peer')
+        if peer is None:
+            return None
+        return dict(peer, name=peer.get('name', f'{socket.gethostname()}:{peer["port"]}'))
@@ -1,57 +1,124 @@
 import asyncio
+import functools
+import discovery
+import journal
+import pipeline
+import presence
+import reconnect
 
 
 class DeviceManager:
-    def __init__(self, devices, adapter_timeout, scan_timeout):
+    def __init__(self, devices, adapter_timeout, scan_timeout, reconnect_backoff=None, state_journal=None,
+                 auto_power_on=False, presence_ttl=30, scan_window=5, scan_interval=30):
         self._adapter = None
+        self._adapter_properties = {}
+        self._auto_power_on = auto_power_on
         self._devices = {d['address']: Device(**d) for d in devices}
         self._adapter_timeout = adapter_timeout
-        self._scan_timeout = scan_timeout
-        self._discovering_clients = 0
+        self._discovery = discovery.Discovery(scan_timeout, scan_window, scan_interval)
+        self._supervisor = reconnect.Supervisor(self, reconnect_backoff or reconnect.Backoff())
+        self._journal = state_journal or journal.Journal()
+        self._presence = presence.Presence(presence_ttl, self._presence_changed)
+        self._presence_stats = {'skipped_discovery': 0}
+        self._pipeline_stats = {'repairs': 0, 'saved_total': 0, 'last_saved': None}
         self._subscriber_queues = set()
 
     async def connect(self, address):
         device = self._devices[address]
+        await self._supervisor.cancel(address)
 
         if device.state != 'disconnected':
             return
         self._publish_state(device, 'connecting')
+        try:
+            await self._repair(device)
+        except BaseException:
+            # A failed or cancelled repair must not leave the device stuck in
+            # connecting, where connect and disconnect both ignore it.
+            if device.state == 'connecting':
+                self._record_phase(device, 'aborted')
+                self._publish_state(device, 'disconnected')
+            raise
 
-        if device.discovered.is_set():
-            await self._adapter.remove_device(device.dbus_proxy)
-            await self._adapter_timeout.wait_event(device.lost)
-
-        self._discovering_clients += 1
-        if self._discovering_clients == 1:
-            await self._adapter.set_discovery_filter({})
-            await self._adapter.start_discovery()
+    async def _repair(self, device):
+        address = device.address
+        if not await self._adapter_ready():
+            self._record_phase(device, 'adapter_unavailable')
+            self._publish_state(device, 'disconnected')
+            return
 
-        try:
-            await self._scan_timeout.wait_event(device.discovered)
-        except asyncio.TimeoutError:
-            pass
+        # A device that is in range and has no bond can be paired on its
+        # existing object; only stale bonds need the remove and rediscover.
+        if device.discovered.is_set() and device.paired is False and device.in_range:
+            self._record_phase(device, 'present')
+            self._presence_stats['skipped_discovery'] += 1
+        else:
+            if device.discovered.is_set():
+                self._record_phase(device, 'remove')
+                await self._adapter.remove_device(device.dbus_proxy)
+                await self._adapter_timeout.wait_event(device.lost)
 
-        self._discovering_clients -= 1
-        if self._discovering_clients == 0:
-            await self._adapter.stop_discovery()
+            self._record_phase(device, 'discover')
+            await self._discovery.find(address, device.discovered)
 
         if device.dbus_proxy:
-            await device.dbus_proxy.pair()
-            await device.dbus_proxy.trust()
-            await device.dbus_proxy.connect()
+            proxy = device.dbus_proxy
+            durations, elapsed = await pipeline.run({
+                'pair': (proxy.pair, []),
+                'trust': (proxy.trust, []),
+                'connect': (proxy.connect, ['pair', 'trust'])
+            }, lambda phase: self._record_phase(device, phase))
+            self._pipeline_stats['repairs'] += 1
+            self._pipeline_stats['last_saved'] = pipeline.saved(durations, elapsed)
+            self._pipeline_stats['saved_total'] += self._pipeline_stats['last_saved']
         else:
+            self._record_phase(device, 'not_found')
             self._publish_state(device, 'disconnected')
 
+    async def find_in_background(self, device):
+        return await self._discovery.find(device.address, device.discovered, background=True)
+
+    async def connect_many(self, addresses):
+        await pipeline.run({address: (functools.partial(self.connect, address), []) for address in addresses})
+
     async def disconnect(self, address):
         device = self._devices[address]
+        await self._supervisor.cancel(address)
         if device.state != 'connected':
             return
         self._publish_state(device, 'disconnecting')
+        self._record_phase(device, 'disconnect')
         await device.dbus_proxy.disconnect()
 
     def get_devices(self):
         return [d.as_dict() for d in self._devices.values()]
 
+    def get_presence(self):
+        return self._presence.get_all()
+
+    def get_journal(self, since=0, limit=None):
+        return self._journal.since(since, limit)
+
+    def accepts_pairing(self, address):
+        return address in self._devices
+
+    def get_health(self):
+        return {
+            'ready': self._adapter is not None and self._adapter_properties.get('Powered') is not False,
+            'adapter': self._adapter is not None,
+            'powered': self._adapter_properties.get('Powered'),
+            'discovering': self._adapter_properties.get('Discovering'),
+            'discoverable': self._adapter_properties.get('Discoverable')
+        }
+
+    def get_stats(self):
+        return {
+            'reconnect': self._supervisor.get_stats(),
+            'pipeline': dict(self._pipeline_stats),
+            'presence': dict(self._presence_stats, devices=self.get_presence()),
+            'subscribers': len(self._subscriber_queues)
+        }
+
     def subscribe(self):
         subscriber = Subscriber(self)
         self._subscriber_queues.add(subscriber.queue)
@@ -63,6 +130,17 @@ class DeviceManager:
 
     def add_adapter(self, dbus_proxy):
         self._adapter = dbus_proxy
+        self._adapter_properties = {}
+        self._discovery.set_adapter(dbus_proxy)
+
+    def update_adapter(self, dbus_proxy, properties):
+        if dbus_proxy is self._adapter:
+            self._adapter_properties.update(properties)
+
+    def remove_adapter(self, dbus_proxy):
+        if dbus_proxy is self._adapter:
+            self._adapter = None
+            self._adapter_properties = {}
 
     def add_device(self, address, dbus_proxy, connected):
         try:
@@ -84,33 +162,88 @@ class DeviceManager:
         device.discovered.clear()
         device.lost.set()
         device.dbus_proxy = None
+        device.paired = None
 
     def update_device(self, address, connected):
         try:
             device = self._devices[address]
         except KeyError:
             return
+        dropped = device.state == 'connected' and not connected
         self._publish_state(device, 'connected' if connected else 'disconnected')
+        if dropped:
+            self._supervisor.device_dropped(device)
+
+    def update_paired(self, address, paired):
+        try:
+            device = self._devices[address]
+        except KeyError:
+            return
+        device.paired = paired
+
+    def device_seen(self, address, rssi):
+        if address in self._devices:
+            self._presence.seen(address, rssi)
+
+    async def _adapter_ready(self):
+        if not self._adapter:
+            return False
+        if self._adapter_properties.get('Powered') is not False:
+            return True
+        if not self._auto_power_on:
+            return False
+        try:
+            await self._adapter.set_powered(True)
+        except RuntimeError:
+            return False
+        return True
+
+    def _record_phase(self, device, phase):
+        self._journal.append('phase', device.address, phase)
 
     def _publish_state(self, device, state):
+        if device.state != state:
+            self._journal.append('state', device.address, state)
         device.state = state
+        self._publish()
+
+    def _presence_changed(self, address):
+        device = self._devices[address]
+        device.in_range = self._presence.is_present(address)
+        self._publish()
+
+    def _publish(self):
         devices = self.get_devices()
         for s in self._subscriber_queues:
             s.put_nowait(devices)
 
 
+class Timeout:
+    def __init__(self, seconds=20):
+        self._seconds = seconds
+
+    async def wait_event(self, event):
+        await asyncio.wait_for(event.wait(), self._seconds)
+
+
 class Device:
-    def __init__(self, name, address):
+    def __init__(self, name, address, reconnect=False):
         self.name = name
         self.address = address
+        self.reconnect = reconnect
         self.state = 'disconnected'
         self.discovered = asyncio.Event()
         self.lost = asyncio.Event()
         self.lost.set()
         self.dbus_proxy = None
+        self.paired = None
+        self.in_range = False
 
     def as_dict(self):
-        return {'name': self.name, 'address': self.address, 'state': self.state}
+        # BlueZ only reports RSSI while scanning, so a linked device counts as
+        # in range whether or not it was heard lately.
+        in_range = self.in_range or self.state != 'disconnected'
+        return {'name': self.name, 'address': self.address, 'state': self.state, 'in_range': in_range}
 
 
 class Subscriber:
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Discovery:
+    def __init__(self, scan_timeout, scan_window=5, scan_interval=30):
+        self._adapter = None
+        self._scan_timeout = scan_timeout
+        self._scan_window = scan_window
+        self._scan_interval = scan_interval
+        self._wanted = {}
+        self._active_waiters = 0
+        self._background_waiters = 0
+        self._scanning = False
+        self._duty_cycle_task = None
+
+    def set_adapter(self, adapter):
+        self._adapter = adapter
+
+    def is_wanted(self, address):
+        return address in self._wanted
+
+    def is_scanning(self):
+        return self._scanning
+
+    async def find(self, address, event, background=False):
+        self._add_waiter(address, background)
+        try:
+            await self._update()
+            try:
+                await self._scan_timeout.wait_event(event)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            self._remove_waiter(address, background)
+            await self._update()
+        return event.is_set()
+
+    def _add_waiter(self, address, background):
+        self._wanted[address] = self._wanted.get(address, 0) + 1
+        if background:
+            self._background_waiters += 1
+        else:
+            self._active_waiters += 1
+
+    def _remove_waiter(self, address, background):
+        self._wanted[address] -= 1
+        if not self._wanted[address]:
+            del self._wanted[address]
+        if background:
+            self._background_waiters -= 1
+        else:
+            self._active_waiters -= 1
+
+    async def _update(self):
+        if self._active_waiters:
+            await self._stop_duty_cycle()
+            await self._start()
+        elif self._background_waiters:
+            if not self._duty_cycle_task:
+                self._duty_cycle_task = asyncio.ensure_future(self._duty_cycle())
+        else:
+            await self._stop_duty_cycle()
+            await self._stop()
+
+    async def _duty_cycle(self):
+        try:
+            while True:
+                try:
+                    await self._start()
+                    await asyncio.sleep(self._scan_window)
+                    await self._stop()
+                except Exception:
+                    logger.exception('background scan failed')
+                    await asyncio.sleep(self._scan_window)
+                await asyncio.sleep(max(self._scan_interval - self._scan_window, 0))
+        finally:
+            if self._duty_cycle_task is asyncio.current_task():
+                self._duty_cycle_task = None
+
+    async def _stop_duty_cycle(self):
+        # Waits for the cancelled cycle to unwind, so a start it was in the
+        # middle of is rolled back before the caller looks at _scanning.
+        task = self._duty_cycle_task
+        if task:
+            task.cancel()
+            self._duty_cycle_task = None
+            await asyncio.wait([task])
+
+    async def _start(self):
+        if self._scanning:
+            return
+        self._scanning = True
+        try:
+            await self._adapter.set_discovery_filter({})
+            await self._adapter.start_discovery()
+        except BaseException:
+            self._scanning = False
+            raise
+
+    async def _stop(self):
+        if not self._scanning:
+            return
+        self._scanning = False
+        await self._adapter.stop_discovery()
@@ -0,0 +1,134 @@
+import asyncio
+import dbus_next
+
+
+class FakeBus:
+    # Stands in for bus.Bus with an in-memory BlueZ: one adapter at
+    # /org/bluez/hci0 and a device object for each address in range.
+    def __init__(self, addresses, latency=0):
+        self.adapter_path = '/org/bluez/hci0'
+        self._latency = latency
+        self._handlers = {}
+        self.exported = {}
+        self._in_range = set(addresses)
+        self._devices = {}
+        self._powered = True
+        self._discovering = False
+        for address in addresses:
+            self._devices[self.device_path(address)] = {'address': address, 'connected': False, 'paired': False}
+
+    def device_path(self, address):
+        return f'{self.adapter_path}/dev_{address.replace(":", "_")}'
+
+    def device_paths(self):
+        return list(self._devices)
+
+    async def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def add_message_handler(self, handler, accept=None):
+        self._handlers[handler] = accept
+
+    def remove_message_handler(self, handler):
+        del self._handlers[handler]
+
+    def export(self, path, interface):
+        self.exported[path] = interface
+
+    def unexport(self, path):
+        del self.exported[path]
+
+    async def call(self, destination, path, interface, member, signature='', body=[]):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if member == 'AddMatch' or interface == 'org.bluez.AgentManager1':
+            return []
+        if member == 'GetManagedObjects':
+            return [self._managed_objects()]
+        if interface == 'org.bluez.Adapter1':
+            return self._adapter_call(member, body)
+        if interface == 'org.freedesktop.DBus.Properties' and member == 'Set':
+            return self._set_property(path, *body)
+        if interface == 'org.bluez.Device1':
+            return self._device_call(path, member)
+        raise RuntimeError(f'org.freedesktop.DBus.Error.UnknownMethod: {interface}.{member}')
+
+    def set_connected(self, address, connected):
+        path = self.device_path(address)
+        device = self._devices.get(path)
+        if not device or device['connected'] == connected:
+            return
+        device['connected'] = connected
+        self.emit(path, 'org.freedesktop.DBus.Properties', 'PropertiesChanged',
+                  ['org.bluez.Device1', {'Connected': dbus_next.Variant('b', connected)}, []])
+
+    def set_paired(self, address, paired):
+        path = self.device_path(address)
+        device = self._devices.get(path)
+        if not device or device['paired'] == paired:
+            return
+        device['paired'] = paired
+        self.emit(path, 'org.freedesktop.DBus.Properties', 'PropertiesChanged',
+                  ['org.bluez.Device1', {'Paired': dbus_next.Variant('b', paired)}, []])
+
+    def emit(self, path, interface, member, body):
+        for handler, accept in list(self._handlers.items()):
+            arg0 = body[0] if body and isinstance(body[0], str) else None
+            if accept is None or accept(path, interface, member, arg0):
+                handler(path, interface, member, body)
+
+    def _managed_objects(self):
+        objects = {self.adapter_path: {'org.bluez.Adapter1': self._adapter_properties()}}
+        for path, device in self._devices.items():
+            objects[path] = {'org.bluez.Device1': self._device_properties(device)}
+        return objects
+
+    def _adapter_properties(self):
+        return {
+            'Powered': dbus_next.Variant('b', self._powered),
+            'Discovering': dbus_next.Variant('b', self._discovering),
+            'Discoverable': dbus_next.Variant('b', False)
+        }
+
+    def _device_properties(self, device):
+        return {
+            'Address': dbus_next.Variant('s', device['address']),
+            'Connected': dbus_next.Variant('b', device['connected']),
+            'Paired': dbus_next.Variant('b', device['paired'])
+        }
+
+    def _adapter_call(self, member, body):
+        if member == 'RemoveDevice':
+            path = body[0]
+            if self._devices.pop(path, None):
+                self.emit('/', 'org.freedesktop.DBus.ObjectManager', 'InterfacesRemoved',
+                          [path, ['org.bluez.Device1']])
+        elif member in ('StartDiscovery', 'StopDiscovery'):
+            self._discovering = member == 'StartDiscovery'
+            if self._discovering:
+                for address in self._in_range:
+                    path = self.device_path(address)
+                    if path not in self._devices:
+                        device = self._devices[path] = {'address': address, 'connected': False, 'paired': False}
+                        self.emit('/', 'org.freedesktop.DBus.ObjectManager', 'InterfacesAdded',
+                                  [path, {'org.bluez.Device1': self._device_properties(device)}])
+        return []
+
+    def _set_property(self, path, interface, name, value):
+        if interface == 'org.bluez.Adapter1' and name == 'Powered':
+            self._powered = value.value
+        return []
+
+    def _device_call(self, path, member):
+        try:
+            device = self._devices[path]
+        except KeyError:
+            raise RuntimeError(f'org.freedesktop.DBus.Error.UnknownObject: {path} does not exist')
+        if member == 'Pair':
+            self.set_paired(device['address'], True)
+        elif member in ('Connect', 'Disconnect'):
+            self.set_connected(device['address'], member == 'Connect')
+        return []
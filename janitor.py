@@ -0,0 +1,63 @@
+import asyncio
+
+
+class Janitor:
+    def __init__(self, client, device_manager, interval=600, batch_size=10, batch_pause=1):
+        self._client = client
+        self._device_manager = device_manager
+        self._interval = interval
+        self._batch_size = batch_size
+        self._batch_pause = batch_pause
+        self._task = None
+        self._pruned = 0
+        self._failed = 0
+        self._runs = 0
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self):
+        per_object = self._client.startup_seconds / self._client.startup_objects if self._client.startup_objects else 0
+        return {
+            'runs': self._runs,
+            'pruned': self._pruned,
+            'failed': self._failed,
+            'objects': self._client.get_object_count(),
+            'startup_objects': self._client.startup_objects,
+            'startup_seconds': self._client.startup_seconds,
+            'startup_seconds_saved': self._pruned * per_object
+        }
+
+    async def prune(self):
+        self._runs += 1
+        tried = set()
+        while True:
+            if tried:
+                await asyncio.sleep(self._batch_pause)
+            if self._device_manager.get_health()['discovering']:
+                return
+            # Devices may have been paired or connected during the pause, so
+            # each batch comes from a fresh list.
+            keep = {d['address'] for d in self._device_manager.get_devices()}
+            stale = [(a, d) for a, d in self._client.get_stale_devices(keep) if d.path not in tried]
+            if not stale:
+                return
+            for adapter, device in stale[:self._batch_size]:
+                tried.add(device.path)
+                try:
+                    await adapter.remove_device(device)
+                except RuntimeError:
+                    self._failed += 1
+                else:
+                    self._pruned += 1
+
+    async def _run(self):
+        while True:
+            if not self._device_manager.get_health()['discovering']:
+                await self.prune()
+            await asyncio.sleep(self._interval)
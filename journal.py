@@ -0,0 +1,95 @@
+import mmap
+import os
+import struct
+import time
+
+_HEADER = struct.Struct('<8sQQ')
+_RECORD = struct.Struct('<Qd16s24s32s')
+_MAGIC = b'BRJRNL01'
+
+
+class Journal:
+    def __init__(self, capacity=1024, path=None):
+        self._capacity = capacity
+        self._entries = [None] * capacity
+        self._next_seq = 1
+        self._file = None
+        self._map = None
+        if path:
+            self._open(path)
+
+    def append(self, kind, address, value):
+        entry = {
+            'seq': self._next_seq,
+            'time': time.time(),
+            'kind': kind,
+            'address': address,
+            'value': value
+        }
+        self._store(entry)
+        if self._map:
+            self._write(entry)
+        return entry
+
+    def last_seq(self):
+        return self._next_seq - 1
+
+    def first_seq(self):
+        return max(self._next_seq - self._capacity, 1)
+
+    def since(self, seq, limit=None):
+        start = max(seq + 1, self.first_seq())
+        stop = self._next_seq
+        if limit is not None:
+            stop = min(stop, start + limit)
+        entries = (self._entries[s % self._capacity] for s in range(start, stop))
+        return [e for e in entries if e is not None]
+
+    def close(self):
+        if self._map:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    def _store(self, entry):
+        self._entries[entry['seq'] % self._capacity] = entry
+        self._next_seq = entry['seq'] + 1
+
+    def _open(self, path):
+        size = _HEADER.size + _RECORD.size * self._capacity
+        exists = os.path.exists(path) and os.path.getsize(path) == size
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        magic, capacity, next_seq = _HEADER.unpack_from(self._map, 0)
+        if magic == _MAGIC and capacity == self._capacity:
+            self._load(next_seq)
+        else:
+            _HEADER.pack_into(self._map, 0, _MAGIC, self._capacity, self._next_seq)
+
+    def _load(self, next_seq):
+        for seq in range(max(next_seq - self._capacity, 1), next_seq):
+            offset = _HEADER.size + _RECORD.size * (seq % self._capacity)
+            stored_seq, timestamp, kind, address, value = _RECORD.unpack_from(self._map, offset)
+            if stored_seq != seq:
+                continue
+            self._store({
+                'seq': seq,
+                'time': timestamp,
+                'kind': _decode(kind),
+                'address': _decode(address),
+                'value': _decode(value)
+            })
+        self._next_seq = next_seq
+
+    def _write(self, entry):
+        offset = _HEADER.size + _RECORD.size * (entry['seq'] % self._capacity)
+        _RECORD.pack_into(self._map, offset, entry['seq'], entry['time'],
+                          entry['kind'].encode(), entry['address'].encode(), entry['value'].encode())
+        _HEADER.pack_into(self._map, 0, _MAGIC, self._capacity, self._next_seq)
+
+
+def _decode(field):
+    return field.rstrip(b'\0').decode(errors='replace')
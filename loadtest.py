@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import websockets
+import wire
+
+# Runs server.app against fake_bus.FakeBus in a child process and points a
+# swarm of websocket and polling clients at it:
+#
+#     python3 loadtest.py --clients 2000 --pollers 100 --rate 50 --duration 60
+#     python3 loadtest.py --soak --duration 3600 --churn 30
+#     python3 loadtest.py --binary --compression
+
+
+def _addresses(count):
+    return [f'00:00:00:00:{i // 256:02X}:{i % 256:02X}' for i in range(count)]
+
+
+def serve(args):
+    import fake_bus
+    import sanic
+    import server
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'config.yaml')
+    with open(path, 'w') as f:
+        f.write(f'journal_capacity: {args.journal_capacity}\n')
+        f.write(f'websocket_compression: {"yes" if args.compression else "no"}\n')
+        f.write('devices:\n')
+        for i, address in enumerate(_addresses(args.devices)):
+            f.write(f'  - name: Device {i}\n    address: {address}\n')
+    server.app.config.BLUEREPAIR_CONFIG = path
+    server.app.config.BLUEREPAIR_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    server.create_bus = lambda: fake_bus.FakeBus(_addresses(args.devices))
+    events = []
+
+    @server.app.post('/loadtest/storm')
+    async def start_storm(request):
+        server.app.add_task(_storm(server.app.ctx.bus, events, request.json['rate'],
+                                   request.json['burst'], request.json['duration']))
+        return sanic.response.empty()
+
+    @server.app.get('/loadtest/events')
+    async def get_events(request):
+        return sanic.response.json(events)
+
+    server.app.run(host='127.0.0.1', port=args.port, single_process=True, access_log=False)
+
+
+async def _storm(fake, events, rate, burst, duration):
+    addresses = _addresses(len(fake._devices))
+    states = {address: False for address in addresses}
+    end = time.time() + duration
+    i = 0
+    while time.time() < end:
+        for _ in range(burst):
+            address = addresses[i % len(addresses)]
+            states[address] = not states[address]
+            events.append([address, 'connected' if states[address] else 'disconnected', time.time()])
+            fake.set_connected(address, states[address])
+            i += 1
+        await asyncio.sleep(1 / rate)
+
+
+class Results:
+    def __init__(self):
+        self.received = []
+        self.messages = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.connect_failures = 0
+        self.sessions = 0
+        self.polls = 0
+        self.poll_errors = 0
+        self.poll_latencies = []
+
+
+async def _websocket_client(url, results, stop, churn, binary):
+    subprotocols = [wire.BINARY] if binary else None
+    while not stop.is_set():
+        try:
+            async with websockets.connect(url, max_size=None, open_timeout=30, subprotocols=subprotocols) as ws:
+                results.sessions += 1
+                decoder = wire.Decoder()
+                deadline = time.time() + churn if churn else None
+                while not stop.is_set() and (not deadline or time.time() < deadline):
+                    try:
+                        timeout = max(deadline - time.time(), 0) if deadline else 1
+                        data = await asyncio.wait_for(ws.recv(), min(timeout, 1))
+                    except asyncio.TimeoutError:
+                        continue
+                    now = time.time()
+                    results.messages += 1
+                    results.bytes += len(data)
+                    message = decoder.decode(data) if isinstance(data, bytes) else json.loads(data)
+                    if isinstance(message, dict):
+                        for device in message.get('changed', []):
+                            results.received.append((device['address'], device['state'], now))
+        except websockets.ConnectionClosed:
+            if not stop.is_set():
+                results.dropped += 1
+        except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake):
+            results.connect_failures += 1
+            await asyncio.sleep(1)
+
+
+async def _http_get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    return status, body
+
+
+async def _http_post(host, port, path, payload):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = json.dumps(payload).encode()
+        writer.write(f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+        await reader.read()
+    finally:
+        writer.close()
+
+
+async def _poller(host, port, interval, results, stop):
+    while not stop.is_set():
+        start = time.time()
+        try:
+            status, _ = await _http_get(host, port, '/devices')
+            results.polls += 1
+            if status != 200:
+                results.poll_errors += 1
+            results.poll_latencies.append(time.time() - start)
+        except OSError:
+            results.poll_errors += 1
+        await asyncio.sleep(interval)
+
+
+def _rss(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def _sample_rss(pid, samples, stop):
+    while not stop.is_set():
+        samples.append(_rss(pid))
+        await asyncio.sleep(1)
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda p: values[min(int(len(values) * p), len(values) - 1)]
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': values[-1], 'count': len(values)}
+
+
+def _latencies(events, received):
+    sent = {}
+    for address, state, timestamp in events:
+        sent.setdefault((address, state), []).append(timestamp)
+    latencies = []
+    for address, state, timestamp in received:
+        times = sent.get((address, state), [])
+        i = bisect.bisect_right(times, timestamp)
+        if i:
+            latencies.append(timestamp - times[i - 1])
+    return latencies
+
+
+async def _wait_for_server(host, port, timeout=30):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            status, _ = await _http_get(host, port, '/health')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('server did not become healthy')
+
+
+async def swarm(args, pid):
+    host, port = '127.0.0.1', args.port
+    await _wait_for_server(host, port)
+    results = Results()
+    stop = asyncio.Event()
+    rss = []
+    tasks = [asyncio.ensure_future(_sample_rss(pid, rss, stop))]
+    url = f'ws://{host}:{port}/ws'
+    for i in range(args.clients):
+        tasks.append(asyncio.ensure_future(_websocket_client(url, results, stop, args.churn, args.binary)))
+        if i % 100 == 99:
+            await asyncio.sleep(0.1)
+    for _ in range(args.pollers):
+        tasks.append(asyncio.ensure_future(_poller(host, port, args.poll_interval, results, stop)))
+    await asyncio.sleep(2)
+
+    start = time.time()
+    await _http_post(host, port, '/loadtest/storm',
+                     {'rate': args.rate, 'burst': args.burst, 'duration': args.duration})
+    await asyncio.sleep(args.duration + 2)
+    elapsed = time.time() - start
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(1)
+
+    _, body = await _http_get(host, port, '/loadtest/events')
+    events = json.loads(body)
+    _, body = await _http_get(host, port, '/stats')
+    stats = json.loads(body)
+    return {
+        'clients': args.clients,
+        'pollers': args.pollers,
+        'storm_events': len(events),
+        'websocket_sessions': results.sessions,
+        'websocket_messages_per_sec': results.messages / elapsed,
+        'websocket_payload_bytes_per_message': results.bytes / results.messages if results.messages else None,
+        'delivery_latency': _percentiles(_latencies(events, results.received)),
+        'dropped_connections': results.dropped,
+        'connect_failures': results.connect_failures,
+        'polls': results.polls,
+        'poll_errors': results.poll_errors,
+        'poll_latency': _percentiles(results.poll_latencies),
+        'rss_start': rss[0] if rss else None,
+        'rss_end': rss[-1] if rss else None,
+        'rss_max': max(rss) if rss else None,
+        'rss_growth': rss[-1] - rss[0] if rss else None,
+        'subscribers_after_close': stats['subscribers'],
+        'loop': stats['loop']
+    }
+
+
+def _raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the BlueRepair server against a fake BlueZ.')
+    parser.add_argument('--clients', type=int, default=1000, help='concurrent /ws clients')
+    parser.add_argument('--pollers', type=int, default=50, help='clients polling /devices')
+    parser.add_argument('--poll-interval', type=float, default=1)
+    parser.add_argument('--devices', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=20, help='storm bursts per second')
+    parser.add_argument('--burst', type=int, default=5, help='state changes per burst')
+    parser.add_argument('--duration', type=float, default=30, help='storm length in seconds')
+    parser.add_argument('--soak', action='store_true', help='long run with client churn to surface leaks')
+    parser.add_argument('--churn', type=float, default=0, help='seconds before each client reconnects')
+    parser.add_argument('--binary', action='store_true', help='use the bluerepair.binary websocket encoding')
+    parser.add_argument('--compression', action='store_true', help='enable websocket permessage-deflate')
+    parser.add_argument('--journal-capacity', type=int, default=1024)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    _raise_file_limit()
+    if args.serve:
+        serve(args)
+        return
+    if args.soak and not args.churn:
+        args.churn = 30
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve',
+                              '--port', str(args.port), '--devices', str(args.devices),
+                              '--journal-capacity', str(args.journal_capacity)]
+                             + (['--compression'] if args.compression else []),
+                             stdout=subprocess.DEVNULL)
+    try:
+        report = asyncio.run(swarm(args, child.pid))
+    finally:
+        child.terminate()
+        child.wait()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import math
+import socket
+import time
+
+
+class Peers(asyncio.DatagramProtocol):
+    # Shares presence and ownership leases with the other hosts listed in the
+    # config over UDP. Every interval each host sends its view of the devices
+    # and the leases it holds. A connect goes to the host that already holds
+    # the lease, else the one hearing the device loudest, else the host with
+    # the lowest name, so only one radio ever pairs a device.
+    def __init__(self, device_manager, name, peers, host='0.0.0.0', port=7531, interval=1, lease_seconds=30,
+                 claim_delay=0.2, clock=time.monotonic):
+        self._device_manager = device_manager
+        self.name = name
+        self._peer_addresses = [_parse_address(peer) for peer in peers]
+        self._local_address = (host, port)
+        self._interval = interval
+        self._lease_seconds = lease_seconds
+        self._claim_delay = claim_delay
+        self._clock = clock
+        self._transport = None
+        self._task = None
+        self._nodes = {}
+        self._leases = {}
+        self._stats = {'sent': 0, 'received': 0, 'invalid': 0, 'unknown_senders': 0, 'forwarded': 0,
+                       'lease_conflicts': 0}
+
+    async def start(self):
+        loop = asyncio.get_event_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=self._local_address)
+        # Datagrams arrive from IP addresses, so peers given by host name are
+        # resolved once to recognise them.
+        family = transport.get_extra_info('socket').family
+        self._peer_addresses = [await _resolve(loop, family, host, port) for host, port in self._peer_addresses]
+        self._task = asyncio.ensure_future(self._heartbeat())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    async def connect(self, address, forwarded=False):
+        owner = self.best_node(address)
+        if owner != self.name and not forwarded:
+            self._forward(owner, 'connect', address)
+            return
+        if await self._claim(address):
+            await self._device_manager.connect(address)
+
+    async def disconnect(self, address):
+        for name, device in self._views(address).items():
+            if device['state'] == 'connected':
+                if name == self.name:
+                    await self._device_manager.disconnect(address)
+                else:
+                    self._forward(name, 'disconnect', address)
+
+    def best_node(self, address):
+        holder = self._lease_holder(address)
+        if holder:
+            return holder
+        heard = [(-device['rssi'], name) for name, device in self._views(address).items()
+                 if device['in_range'] and device['rssi'] is not None]
+        if heard:
+            return min(heard)[1]
+        return min(self._live_nodes() + [self.name])
+
+    def get_devices(self):
+        devices = []
+        local_view = self._local_view()
+        for device in self._device_manager.get_devices():
+            views = self._views(device['address'], local_view)
+            devices.append(dict(device,
+                                state=max((v['state'] for v in views.values()), key=_STATE_RANK.get),
+                                in_range=any(v['in_range'] for v in views.values()),
+                                owner=self._lease_holder(device['address']),
+                                nodes=views))
+        return devices
+
+    def get_stats(self):
+        return dict(self._stats, name=self.name, nodes=self._live_nodes())
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def datagram_received(self, data, addr):
+        if tuple(addr[:2]) not in self._peer_addresses:
+            self._stats['unknown_senders'] += 1
+            return
+        try:
+            message = json.loads(data)
+            kind = message['type']
+            node = message['node']
+        except (ValueError, KeyError, TypeError):
+            self._stats['invalid'] += 1
+            return
+        if not isinstance(node, str):
+            self._stats['invalid'] += 1
+            return
+        if node == self.name:
+            return
+        self._stats['received'] += 1
+        address = message.get('address')
+        if kind == 'state':
+            if _valid_state(message):
+                self._update_node(node, addr, message)
+            else:
+                self._stats['invalid'] += 1
+        elif not isinstance(address, str) or not self._device_manager.accepts_pairing(address):
+            self._stats['invalid'] += 1
+        elif kind == 'connect':
+            asyncio.ensure_future(self.connect(address, forwarded=True))
+        elif kind == 'disconnect':
+            asyncio.ensure_future(self._device_manager.disconnect(address))
+
+    def _update_node(self, node, addr, message):
+        now = self._clock()
+        self._nodes[node] = {'addr': addr, 'seen': now, 'devices': message.get('devices', {})}
+        leases = message.get('leases', {})
+        for address, (holder, _) in list(self._leases.items()):
+            if holder == node and address not in leases:
+                del self._leases[address]
+        for address, remaining in leases.items():
+            current = self._leases.get(address)
+            # Two hosts claiming at once both see the other's claim within
+            # claim_delay, and both keep the one from the lower name.
+            if (not current or current[0] == node or current[1] <= now or node < current[0]):
+                if current and current[0] == self.name and current[1] > now:
+                    self._stats['lease_conflicts'] += 1
+                self._leases[address] = (node, now + remaining)
+
+    async def _claim(self, address):
+        holder = self._lease_holder(address)
+        if holder and holder != self.name:
+            self._stats['lease_conflicts'] += 1
+            return False
+        self._leases[address] = (self.name, self._clock() + self._lease_seconds)
+        self._send_state()
+        await asyncio.sleep(self._claim_delay)
+        return self._lease_holder(address) == self.name
+
+    def _lease_holder(self, address):
+        try:
+            holder, expiry = self._leases[address]
+        except KeyError:
+            return None
+        if expiry <= self._clock() or (holder != self.name and holder not in self._live_nodes()):
+            return None
+        return holder
+
+    def _live_nodes(self):
+        oldest = self._clock() - 3 * self._interval
+        return [name for name, node in self._nodes.items() if node['seen'] > oldest]
+
+    def _views(self, address, local_view=None):
+        views = {self.name: (local_view or self._local_view())[address]}
+        for name in self._live_nodes():
+            try:
+                views[name] = self._nodes[name]['devices'][address]
+            except KeyError:
+                pass
+        return views
+
+    def _local_view(self):
+        presence = self._device_manager.get_presence()
+        return {d['address']: {'state': d['state'],
+                               'in_range': d['in_range'],
+                               'rssi': presence[d['address']]['rssi'] if d['address'] in presence else None}
+                for d in self._device_manager.get_devices()}
+
+    def _send_state(self):
+        now = self._clock()
+        view = self._local_view()
+        leases = {}
+        for address, (holder, expiry) in list(self._leases.items()):
+            if holder != self.name:
+                continue
+            # A lease lasts while this host is using the device and for
+            # lease_seconds after, so a quick reconnect stays on this host.
+            if view[address]['state'] != 'disconnected':
+                expiry = now + self._lease_seconds
+                self._leases[address] = (holder, expiry)
+            if expiry <= now:
+                del self._leases[address]
+            else:
+                leases[address] = expiry - now
+        self._send_all({'type': 'state', 'node': self.name, 'devices': view, 'leases': leases})
+
+    def _forward(self, node, kind, address):
+        self._stats['forwarded'] += 1
+        self._send(self._nodes[node]['addr'], {'type': kind, 'node': self.name, 'address': address})
+
+    def _send_all(self, message):
+        for addr in self._peer_addresses:
+            self._send(addr, message)
+
+    def _send(self, addr, message):
+        if self._transport:
+            self._transport.sendto(json.dumps(message).encode(), addr)
+            self._stats['sent'] += 1
+
+    async def _heartbeat(self):
+        while True:
+            self._send_state()
+            await asyncio.sleep(self._interval)
+
+
+_STATE_RANK = {'disconnected': 0, 'disconnecting': 1, 'connecting': 2, 'connected': 3}
+
+
+def _parse_address(peer):
+    host, _, port = peer.rpartition(':')
+    return host, int(port)
+
+
+async def _resolve(loop, family, host, port):
+    info = await loop.getaddrinfo(host, port, family=family, type=socket.SOCK_DGRAM)
+    return tuple(info[0][4][:2])
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _valid_view(view):
+    return (isinstance(view, dict)
+            and isinstance(view.get('state'), str) and view['state'] in _STATE_RANK
+            and isinstance(view.get('in_range'), bool)
+            and (view.get('rssi') is None or _is_number(view['rssi'])))
+
+
+def _valid_state(message):
+    devices = message.get('devices', {})
+    leases = message.get('leases', {})
+    return (isinstance(devices, dict) and all(_valid_view(v) for v in devices.values())
+            and isinstance(leases, dict) and all(_is_number(r) for r in leases.values()))
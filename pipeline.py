@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+
+async def run(steps, on_start=None):
+    # steps maps a name to (coroutine function, names it depends on). Each step
+    # starts as soon as its dependencies finish. A failed step skips everything
+    # that depends on it; the rest still run and the first error is raised at
+    # the end. Returns the duration of every step and the total wall time.
+    start = time.perf_counter()
+    durations = {}
+    errors = []
+    done = {name: asyncio.get_event_loop().create_future() for name in steps}
+
+    async def run_step(name, func, dependencies):
+        try:
+            for dependency in dependencies:
+                if not await done[dependency]:
+                    done[name].set_result(False)
+                    return
+            if on_start:
+                on_start(name)
+            step_start = time.perf_counter()
+            try:
+                await func()
+            except Exception as e:
+                errors.append(e)
+                done[name].set_result(False)
+                return
+            durations[name] = time.perf_counter() - step_start
+            done[name].set_result(True)
+        finally:
+            if not done[name].done():
+                done[name].set_result(False)
+
+    tasks = [asyncio.ensure_future(run_step(name, func, dependencies))
+             for name, (func, dependencies) in steps.items()]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    if errors:
+        raise errors[0]
+    return durations, time.perf_counter() - start
+
+
+def saved(durations, elapsed):
+    return max(sum(durations.values()) - elapsed, 0)
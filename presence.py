@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+
+class Presence:
+    def __init__(self, ttl=30, on_change=None, clock=time.monotonic):
+        self._ttl = ttl
+        self._on_change = on_change
+        self._clock = clock
+        self._seen = {}
+        self._timers = {}
+
+    def seen(self, address, rssi=None):
+        entered = not self.is_present(address)
+        previous = self._seen.get(address)
+        if rssi is None and previous:
+            rssi = previous[1]
+        self._seen[address] = (self._clock(), rssi)
+        if address not in self._timers:
+            self._timers[address] = asyncio.get_event_loop().call_later(self._ttl, self._expire, address)
+        if entered and self._on_change:
+            self._on_change(address)
+
+    def is_present(self, address):
+        try:
+            last_seen, _ = self._seen[address]
+        except KeyError:
+            return False
+        return self._clock() - last_seen < self._ttl
+
+    def get(self, address):
+        try:
+            last_seen, rssi = self._seen[address]
+        except KeyError:
+            return None
+        return {'age': self._clock() - last_seen, 'rssi': rssi, 'present': self.is_present(address)}
+
+    def get_all(self):
+        return {address: self.get(address) for address in self._seen}
+
+    def _expire(self, address):
+        # Timers are only re-armed here, so frequent RSSI updates cost a tuple
+        # store rather than a timer reschedule.
+        del self._timers[address]
+        remaining = self._seen[address][0] + self._ttl - self._clock()
+        if remaining > 0:
+            self._timers[address] = asyncio.get_event_loop().call_later(remaining, self._expire, address)
+        elif self._on_change:
+            self._on_change(address)
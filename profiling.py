@@ -0,0 +1,114 @@
+import asyncio
+import collections
+import sys
+import threading
+import time
+
+
+class LoopMonitor:
+    def __init__(self, interval=0.25, slow_callback=0.05):
+        self._interval = interval
+        self._slow_callback = slow_callback
+        self._task = None
+        self._original_run = None
+        self._lag_max = 0
+        self._lag_total = 0
+        self._samples = 0
+        self._stalls = {}
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._measure_lag())
+        self._patch_handles()
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._original_run:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    def get_stats(self):
+        return {
+            'loop': type(asyncio.get_event_loop()).__module__,
+            'lag_max': self._lag_max,
+            'lag_avg': self._lag_total / self._samples if self._samples else 0,
+            'stalls': {name: dict(stall) for name, stall in self._stalls.items()}
+        }
+
+    async def _measure_lag(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - start - self._interval, 0)
+            self._lag_max = max(self._lag_max, lag)
+            self._lag_total += lag
+            self._samples += 1
+
+    def _patch_handles(self):
+        # Only the pure-Python Handle can be instrumented; alternative loops
+        # such as uvloop still get lag measurements.
+        if not isinstance(asyncio.get_event_loop(), asyncio.BaseEventLoop) or self._original_run:
+            return
+        original_run = self._original_run = asyncio.Handle._run
+        monitor = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            original_run(handle)
+            duration = time.perf_counter() - start
+            if duration >= monitor._slow_callback:
+                monitor._record_stall(handle, duration)
+
+        asyncio.Handle._run = _run
+
+    def _record_stall(self, handle, duration):
+        stall = self._stalls.setdefault(_describe(handle), {'count': 0, 'total': 0, 'max': 0})
+        stall['count'] += 1
+        stall['total'] += duration
+        stall['max'] = max(stall['max'], duration)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self._interval = interval
+        self._lock = asyncio.Lock()
+
+    def busy(self):
+        return self._lock.locked()
+
+    async def profile(self, seconds):
+        async with self._lock:
+            stacks = collections.Counter()
+            stop = threading.Event()
+            thread = threading.Thread(target=self._sample,
+                                      args=(threading.get_ident(), stacks, stop),
+                                      daemon=True)
+            thread.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.get_event_loop().run_in_executor(None, thread.join)
+            return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    def _sample(self, thread_id, stacks, stop):
+        while not stop.wait(self._interval):
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if names:
+                stacks[';'.join(reversed(names))] += 1
+
+
+def _describe(handle):
+    callback = handle._callback
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, '__qualname__', repr(coro))
+    return getattr(callback, '__qualname__', repr(callback))
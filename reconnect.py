@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    def __init__(self, initial=1, maximum=60, factor=2):
+        self._initial = initial
+        self._maximum = maximum
+        self._factor = factor
+
+    def delay(self, attempt):
+        delay = min(self._initial * self._factor ** attempt, self._maximum)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def sleep(self, attempt):
+        await asyncio.sleep(self.delay(attempt))
+
+
+class Supervisor:
+    def __init__(self, device_manager, backoff, max_attempts=3):
+        self._device_manager = device_manager
+        self._backoff = backoff
+        self._max_attempts = max_attempts
+        self._tasks = {}
+        self._stats = {}
+
+    def device_dropped(self, device):
+        if not device.reconnect or device.address in self._tasks:
+            return
+        self._tasks[device.address] = asyncio.ensure_future(self._reconnect(device))
+
+    async def cancel(self, address):
+        task = self._tasks.get(address)
+        # An escalation calls device_manager.connect, which cancels any
+        # reconnect for the device; that must not cancel the escalation itself.
+        if not task or task is asyncio.current_task():
+            return
+        del self._tasks[address]
+        task.cancel()
+        # Lets a cancelled escalation put the device back to disconnected
+        # before the caller looks at its state.
+        await asyncio.wait([task])
+
+    def is_reconnecting(self, address):
+        return address in self._tasks
+
+    def get_stats(self):
+        return {address: dict(stats) for address, stats in self._stats.items()}
+
+    async def _reconnect(self, device):
+        stats = self._stats.setdefault(device.address, {
+            'drops': 0,
+            'attempts': 0,
+            'reconnects': 0,
+            'escalations': 0,
+            'escalation_failures': 0,
+            'last_latency': None
+        })
+        stats['drops'] += 1
+        start = time.monotonic()
+        try:
+            for attempt in range(self._max_attempts):
+                await self._backoff.sleep(attempt)
+                if device.state != 'disconnected':
+                    return
+                # A device BlueZ has forgotten needs to be seen again before a
+                # plain connect can work, which a low duty scan is enough for.
+                if not device.dbus_proxy and not await self._device_manager.find_in_background(device):
+                    continue
+                stats['attempts'] += 1
+                try:
+                    await device.dbus_proxy.connect()
+                except Exception:
+                    continue
+                stats['reconnects'] += 1
+                stats['last_latency'] = time.monotonic() - start
+                return
+            stats['escalations'] += 1
+            try:
+                await self._device_manager.connect(device.address)
+            except Exception:
+                logger.exception('escalated reconnect of %s failed', device.address)
+                stats['escalation_failures'] += 1
+                return
+            if device.state != 'disconnected':
+                stats['last_latency'] = time.monotonic() - start
+        finally:
+            if self._tasks.get(device.address) is asyncio.current_task():
+                del self._tasks[device.address]
@@ -1,51 +1,192 @@
-import asyncio
+import assets
 import bluez
 import bus
 import config
 import device_manager
+import functools
+import janitor
+import journal
 import json
+import logging
+import peers
+import profiling
 import sanic
+import sanic.server.protocols.websocket_protocol
+import websockets.extensions.permessage_deflate
+import wire
 
-
-class Timeout:
-    async def wait_event(self, event):
-        await asyncio.wait_for(event.wait(), 20)
-
+logger = logging.getLogger(__name__)
 
 app = sanic.Sanic(__name__)
+app.config.BLUEREPAIR_CONFIG = 'config.yaml'
+app.config.BLUEREPAIR_STATIC = './static'
+
+def create_bus():
+    return bus.Bus()
 
-app.static('/', './static')
-app.static('/', './static/index.html')
+def configure_websockets(compression):
+    # Sanic builds websockets' ServerProtocol itself, so clients that offer no
+    # subprotocol and permessage-deflate are supported by handing it a
+    # preconfigured one. That module attribute is Sanic internals, only known
+    # to exist in the versions listed in the README.
+    protocol = sanic.server.protocols.websocket_protocol
+    if not hasattr(protocol, 'ServerProtocol'):
+        logger.warning('sanic has no websocket ServerProtocol to configure; clients that offer no subprotocol '
+                       'may be refused and permessage-deflate is off')
+        return
+    server_protocol = getattr(protocol.ServerProtocol, 'func', protocol.ServerProtocol)
+    extensions = [websockets.extensions.permessage_deflate.ServerPerMessageDeflateFactory()] if compression else None
+    protocol.ServerProtocol = functools.partial(server_protocol,
+                                                select_subprotocol=wire.select_subprotocol,
+                                                extensions=extensions)
 
 @app.before_server_start
 async def start_dbus_client(app, loop):
-    app.ctx.device_manager = device_manager.DeviceManager(config.Config().get_devices(), Timeout(), Timeout())
-    app.ctx.bus = bus.Bus()
+    app_config = config.Config(app.config.BLUEREPAIR_CONFIG)
+    configure_websockets(app_config.get_websocket_compression())
+    app.ctx.loop_monitor = profiling.LoopMonitor()
+    app.ctx.loop_monitor.start()
+    app.ctx.profiler = profiling.SamplingProfiler() if app_config.get_debug_profile() else None
+    app.ctx.assets = assets.Assets(app.config.BLUEREPAIR_STATIC, inline=app_config.get_inline_assets())
+    app.ctx.journal = journal.Journal(app_config.get_journal_capacity(), app_config.get_journal_path())
+    app.ctx.device_manager = device_manager.DeviceManager(app_config.get_devices(),
+                                                          device_manager.Timeout(),
+                                                          device_manager.Timeout(),
+                                                          state_journal=app.ctx.journal,
+                                                          auto_power_on=app_config.get_auto_power_on(),
+                                                          presence_ttl=app_config.get_presence_ttl(),
+                                                          scan_window=app_config.get_scan_window(),
+                                                          scan_interval=app_config.get_scan_interval())
+    app.ctx.bus = create_bus()
     await app.ctx.bus.connect()
     app.ctx.bluez_client = await bluez.connect(app.ctx.bus, app.ctx.device_manager)
+    app.ctx.agent = bluez.Agent(app.ctx.bus, app.ctx.bluez_client, app.ctx.device_manager,
+                                app_config.get_agent_capability())
+    await app.ctx.agent.register()
+    app.ctx.janitor = janitor.Janitor(app.ctx.bluez_client, app.ctx.device_manager)
+    if app_config.get_prune_devices():
+        app.ctx.janitor.start()
+    peer = app_config.get_peer()
+    app.ctx.peers = None
+    if peer:
+        app.ctx.peers = peers.Peers(app.ctx.device_manager, peer['name'], peer['peers'], peer['host'], peer['port'],
+                                    peer['interval'], peer['lease_seconds'])
+        await app.ctx.peers.start()
 
 @app.after_server_stop
 async def stop_dbus_client(app, loop):
+    if app.ctx.peers:
+        app.ctx.peers.stop()
+    app.ctx.janitor.stop()
+    try:
+        await app.ctx.agent.unregister()
+    except RuntimeError:
+        logger.exception('could not unregister the pairing agent')
     app.ctx.bluez_client.disconnect()
     app.ctx.bus.disconnect()
+    app.ctx.journal.close()
+    app.ctx.loop_monitor.stop()
+
+@app.get("/")
+async def index(request):
+    return serve_asset(request, app.ctx.assets.index)
+
+@app.get("/<name>")
+async def static_asset(request, name):
+    asset = app.ctx.assets.get(name)
+    if not asset:
+        raise sanic.exceptions.NotFound(f'{name} not found')
+    return serve_asset(request, asset)
+
+def serve_asset(request, asset):
+    encoding, body = asset.select(request.headers.get('accept-encoding'))
+    headers = asset.headers(encoding)
+    if asset.matches(request.headers.get('if-none-match'), encoding):
+        return sanic.response.empty(status=304, headers=headers)
+    return sanic.response.raw(body, headers=headers, content_type=asset.content_type)
 
 @app.get("/devices")
 async def devices(request):
+    if app.ctx.peers:
+        return sanic.response.json(app.ctx.peers.get_devices())
     return sanic.response.json(app.ctx.device_manager.get_devices())
 
+@app.get("/health")
+async def health(request):
+    health = app.ctx.device_manager.get_health()
+    return sanic.response.json(health, status=200 if health['ready'] else 503)
+
+@app.get("/stats")
+async def stats(request):
+    return sanic.response.json(dict(app.ctx.device_manager.get_stats(),
+                                    agent=app.ctx.agent.get_stats(),
+                                    janitor=app.ctx.janitor.get_stats(),
+                                    peers=app.ctx.peers and app.ctx.peers.get_stats(),
+                                    loop=app.ctx.loop_monitor.get_stats()))
+
+@app.get("/debug/profile")
+async def debug_profile(request):
+    if not app.ctx.profiler:
+        raise sanic.exceptions.NotFound('profiling is disabled')
+    if app.ctx.profiler.busy():
+        return sanic.response.text('a profile is already running', status=409)
+    try:
+        seconds = float(request.args.get('seconds', 5))
+    except ValueError:
+        raise sanic.exceptions.BadRequest('seconds must be a number')
+    if not seconds > 0:
+        raise sanic.exceptions.BadRequest('seconds must be positive')
+    seconds = min(seconds, 60)
+    return sanic.response.text(await app.ctx.profiler.profile(seconds))
+
+def int_arg(request, name, default=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise sanic.exceptions.BadRequest(f'{name} must be an integer')
+
+@app.get("/journal")
+async def get_journal(request):
+    since = int_arg(request, 'since', 0)
+    limit = int_arg(request, 'limit')
+    return sanic.response.json(app.ctx.device_manager.get_journal(since, limit))
+
 @app.post("/devices/connect")
 async def devices_connect(request):
-    app.add_task(app.ctx.device_manager.connect(request.json['address']))
+    if app.ctx.peers:
+        for address in request.json.get('addresses') or [request.json['address']]:
+            app.add_task(app.ctx.peers.connect(address))
+    elif 'addresses' in request.json:
+        app.add_task(app.ctx.device_manager.connect_many(request.json['addresses']))
+    else:
+        app.add_task(app.ctx.device_manager.connect(request.json['address']))
     return sanic.response.empty()
 
 @app.post("/devices/disconnect")
 async def devices_disconnect(request):
-    app.add_task(app.ctx.device_manager.disconnect(request.json['address']))
+    if app.ctx.peers:
+        app.add_task(app.ctx.peers.disconnect(request.json['address']))
+    else:
+        app.add_task(app.ctx.device_manager.disconnect(request.json['address']))
     return sanic.response.empty()
 
-@app.websocket("/ws")
+@app.websocket("/ws", subprotocols=wire.SUBPROTOCOLS)
 async def websocket(request, ws):
+    encoder = wire.encoder(ws.subprotocol)
+    try:
+        since = int_arg(request, 'since')
+    except sanic.exceptions.BadRequest as e:
+        # The handshake is already done, so refuse with a policy violation.
+        await ws.close(1008, str(e))
+        return
     with app.ctx.device_manager.subscribe() as queue:
+        if since is not None:
+            replay = app.ctx.device_manager.get_journal(since)
+            await ws.send(json.dumps({'journal': replay}))
         while True:
-            devices = await queue.get()
-            await ws.send(json.dumps(devices))
+            message = encoder.encode(await queue.get())
+            if message is not None:
+                await ws.send(message)
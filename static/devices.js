@@ -1,24 +1,124 @@
+var devices = new Map();
+var buttons = new Map();
+var pending = [];
+var frame_requested = false;
+var STATES = ['disconnected', 'connecting', 'connected', 'disconnecting'];
+var IN_RANGE = 0x80;
+var dictionary = [];
+var text_decoder = new TextDecoder();
+
 function receive_message(event) {
-    var devices = JSON.parse(event.data);
-    var buttons = devices.map(make_button);
-    document.body.replaceChildren(...buttons);
+    if (typeof event.data === 'string') {
+        pending.push(JSON.parse(event.data));
+    } else {
+        pending.push(decode_frame(new Uint8Array(event.data)));
+    }
+    if (!frame_requested) {
+        frame_requested = true;
+        window.requestAnimationFrame(render);
+    }
+}
+
+function render() {
+    var messages = pending;
+    pending = [];
+    frame_requested = false;
+    messages.forEach(apply_message);
+}
+
+// See wire.py for the layout of bluerepair.binary frames.
+function decode_frame(bytes) {
+    if (bytes[0] == 0) {
+        var count = (bytes[1] << 8) | bytes[2];
+        var offset = 3;
+        dictionary = [];
+        for (var i = 0; i < count; i++) {
+            var status = bytes[offset];
+            var length = bytes[offset + 1];
+            var address = text_decoder.decode(bytes.subarray(offset + 2, offset + 2 + length));
+            offset += 2 + length;
+            length = bytes[offset];
+            var name = text_decoder.decode(bytes.subarray(offset + 1, offset + 1 + length));
+            offset += 1 + length;
+            dictionary.push(with_status({'name': name, 'address': address}, status));
+        }
+        return dictionary;
+    }
+    var id_size = dictionary.length <= 256 ? 1 : 2;
+    var changed = [];
+    for (var offset = 1; offset < bytes.length; offset += id_size + 1) {
+        var id = id_size == 1 ? bytes[offset] : (bytes[offset] << 8) | bytes[offset + 1];
+        dictionary[id] = with_status({'name': dictionary[id]['name'], 'address': dictionary[id]['address']},
+                                     bytes[offset + id_size]);
+        changed.push(dictionary[id]);
+    }
+    return {'changed': changed};
+}
+
+function with_status(device, status) {
+    device['state'] = STATES[status & ~IN_RANGE];
+    device['in_range'] = (status & IN_RANGE) != 0;
+    return device;
+}
+
+function apply_message(message) {
+    if (Array.isArray(message)) {
+        apply_snapshot(message);
+    } else if (message['changed']) {
+        message['changed'].forEach(update_button);
+    }
+}
+
+function apply_snapshot(snapshot) {
+    var addresses = new Set(snapshot.map(function(device) {
+        return device['address'];
+    }));
+    buttons.forEach(function(button, address) {
+        if (!addresses.has(address)) {
+            button.remove();
+            buttons.delete(address);
+            devices.delete(address);
+        }
+    });
+    document.querySelectorAll('button.loading').forEach(function(button) {
+        button.remove();
+    });
+    snapshot.forEach(function(device) {
+        document.body.appendChild(update_button(device));
+    });
+}
+
+function update_button(device) {
+    var address = device['address'];
+    var button = buttons.get(address);
+    if (!button) {
+        button = make_button(address);
+        buttons.set(address, button);
+    }
+    var old = devices.get(address);
+    if (!old || old['state'] != device['state'] || old['in_range'] != device['in_range']) {
+        button.className = device['state'] + (device['in_range'] ? '' : ' away');
+    }
+    if (!old || old['name'] != device['name']) {
+        button.innerText = device['name'];
+    }
+    devices.set(address, device);
+    return button;
 }
 
-function make_button(device) {
+function make_button(address) {
     var button = document.createElement('button');
-    button.className = device['state'];
-    button.innerText = device['name'];
     button.addEventListener('click', function(event) {
-        switch (device['state']) {
+        switch (devices.get(address)['state']) {
             case 'disconnected':
                 var req = new XMLHttpRequest();
                 req.open('POST', '/devices/connect');
-                req.send(JSON.stringify({'address': device['address']}));
+                req.send(JSON.stringify({'address': address}));
                 break;
             case 'connected':
                 var req = new XMLHttpRequest();
                 req.open('POST', '/devices/disconnect');
-                req.send(JSON.stringify({'address': device['address']}));
+                req.send(JSON.stringify({'address': address}));
                 break;
         }
     });
@@ -26,6 +126,7 @@ function make_button(device) {
 }
 
 document.addEventListener('DOMContentLoaded', function(event) {
-    var socket = new WebSocket('ws://' + location.host + '/ws');
+    var socket = new WebSocket('ws://' + location.host + '/ws', ['bluerepair.binary', 'bluerepair.json']);
+    socket.binaryType = 'arraybuffer';
     socket.addEventListener('message', receive_message)
 });
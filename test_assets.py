@@ -0,0 +1,94 @@
+import assets
+import gzip
+import os
+import tempfile
+import unittest
+
+
+class AssetsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.write('index.html', '<html><head><link rel="stylesheet" href="style.css">'
+                                 '<script src="devices.js"></script></head></html>')
+        self.write('style.css', 'body { color: black; }\n' * 20)
+        self.write('devices.js', 'function f() {}\n')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.dir.name, name), 'w') as f:
+            f.write(text)
+
+    def fingerprinted(self, static, prefix):
+        names = [n for n in static.names() if n.startswith(prefix + '.')]
+        self.assertEqual(len(names), 1)
+        return names[0]
+
+    def test_fingerprinted_references(self):
+        static = assets.Assets(self.dir.name)
+        css = self.fingerprinted(static, 'style')
+        js = self.fingerprinted(static, 'devices')
+        self.assertRegex(css, r'^style\.[0-9a-f]{10}\.css$')
+        html = static.index.encodings['identity'].decode()
+        self.assertIn(f'href="{css}"', html)
+        self.assertIn(f'src="{js}"', html)
+        self.assertIsNone(static.get('style.css'))
+
+    def test_fingerprint_changes_with_content(self):
+        before = self.fingerprinted(assets.Assets(self.dir.name), 'style')
+        self.write('style.css', 'body { color: white; }')
+        after = self.fingerprinted(assets.Assets(self.dir.name), 'style')
+        self.assertNotEqual(before, after)
+
+    def test_cache_headers(self):
+        static = assets.Assets(self.dir.name)
+        css = static.get(self.fingerprinted(static, 'style'))
+        self.assertIn('immutable', css.headers('identity')['Cache-Control'])
+        self.assertEqual(static.index.headers('identity')['Cache-Control'], 'no-cache')
+        self.assertEqual(css.headers('identity')['ETag'], css.etag('identity'))
+
+    def test_etag_per_encoding(self):
+        static = assets.Assets(self.dir.name)
+        css = static.get(self.fingerprinted(static, 'style'))
+        self.assertNotEqual(css.etag('identity'), css.etag('gzip'))
+        self.assertEqual(css.headers('gzip')['ETag'], css.etag('gzip'))
+
+    def test_if_none_match(self):
+        static = assets.Assets(self.dir.name)
+        css = static.get(self.fingerprinted(static, 'style'))
+        gzip_tag = css.etag('gzip')
+        self.assertTrue(css.matches(gzip_tag, 'gzip'))
+        self.assertTrue(css.matches('"other", W/' + gzip_tag, 'gzip'))
+        self.assertTrue(css.matches('*', 'identity'))
+        self.assertFalse(css.matches(gzip_tag, 'identity'))
+        self.assertFalse(css.matches(None, 'gzip'))
+        self.assertEqual(css.content_type, 'text/css')
+
+    def test_gzip_negotiation(self):
+        static = assets.Assets(self.dir.name)
+        css = static.get(self.fingerprinted(static, 'style'))
+        encoding, body = css.select('gzip, deflate')
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(gzip.decompress(body), css.encodings['identity'])
+        self.assertEqual(css.headers(encoding)['Content-Encoding'], 'gzip')
+
+    def test_identity_negotiation(self):
+        static = assets.Assets(self.dir.name)
+        css = static.get(self.fingerprinted(static, 'style'))
+        self.assertEqual(css.select(None)[0], 'identity')
+        self.assertEqual(css.select('gzip;q=0')[0], 'identity')
+        self.assertNotIn('Content-Encoding', css.headers('identity'))
+
+    def test_skip_compression_that_grows(self):
+        static = assets.Assets(self.dir.name)
+        js = static.get(self.fingerprinted(static, 'devices'))
+        self.assertEqual(js.select('gzip')[0], 'identity')
+
+    def test_inline(self):
+        static = assets.Assets(self.dir.name, inline=True)
+        html = static.index.encodings['identity'].decode()
+        self.assertIn('<style>body { color: black; }', html)
+        self.assertIn('<script>function f() {}', html)
+        self.assertNotIn('href=', html)
+        self.assertNotIn('src=', html)
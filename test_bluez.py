@@ -1,6 +1,7 @@
 import asyncio
 import bluez
 import dbus_next
+import dbus_next.service
 import unittest
 import unittest.mock
 
@@ -10,6 +11,7 @@ class BluezTest(unittest.TestCase):
         self.loop = asyncio.new_event_loop()
         self.bus = MockBus(self)
         self.listener = unittest.mock.Mock()
+        self.listener.accepts_pairing.side_effect = lambda address: address == '00:11:22:33:44:55'
         self.client = self.loop.run_until_complete(bluez.connect(self.bus, self.listener))
 
     def send_interfaces_added(self, path, interfaces):
@@ -63,6 +65,42 @@ class BluezTest(unittest.TestCase):
         })
         self.assert_adapter_added('/apt')
     
+    def test_adapter_properties(self):
+        self.send_interfaces_added('/apt', {
+            'org.bluez.Adapter1': {
+                'Powered': dbus_next.Variant('b', False),
+                'Discovering': dbus_next.Variant('b', False),
+                'Address': dbus_next.Variant('s', '00:00:00:00:00:01')
+            }
+        })
+        args, _ = self.listener.update_adapter.call_args
+        self.assertEqual(args[0].path, '/apt')
+        self.assertEqual(args[1], {'Powered': False, 'Discovering': False})
+
+    def test_adapter_properties_changed(self):
+        self.send_properties_changed('/ad', 'org.bluez.Adapter1', {
+            'Powered': dbus_next.Variant('b', True),
+            'Alias': dbus_next.Variant('s', 'pi')
+        })
+        args, _ = self.listener.update_adapter.call_args
+        self.assertEqual(args[0].path, '/ad')
+        self.assertEqual(args[1], {'Powered': True})
+
+    def test_adapter_ignored_properties_changed(self):
+        self.send_properties_changed('/ad', 'org.bluez.Adapter1', {
+            'Alias': dbus_next.Variant('s', 'pi')
+        })
+        self.listener.update_adapter.assert_not_called()
+
+    def test_accept_adapter_properties(self):
+        accepted = self.bus.accept('/ad', 'org.freedesktop.DBus.Properties', 'PropertiesChanged', 'org.bluez.Adapter1')
+        self.assertEqual(accepted, {'Powered', 'Discovering', 'Discoverable'})
+
+    def test_remove_adapter(self):
+        self.send_interfaces_removed('/ad', ['org.bluez.Adapter1'])
+        args, _ = self.listener.remove_adapter.call_args
+        self.assertEqual(args[0].path, '/ad')
+
     def test_initial_devices(self):
         self.assert_device_added('00:11:22:33:44:55', '/ad/dev1', False)
         self.assert_device_added('66:77:88:99:AA:BB', '/ad/dev2', True)
@@ -99,6 +137,55 @@ class BluezTest(unittest.TestCase):
         })
         self.listener.update_device.assert_not_called()
 
+    def test_accept_object_manager_signals(self):
+        self.assertTrue(self.bus.accept('/', 'org.freedesktop.DBus.ObjectManager', 'InterfacesAdded', '/ad/dev3'))
+        self.assertTrue(self.bus.accept('/', 'org.freedesktop.DBus.ObjectManager', 'InterfacesRemoved', '/ad/dev3'))
+
+    def test_accept_known_device_properties(self):
+        accepted = self.bus.accept('/ad/dev2', 'org.freedesktop.DBus.Properties', 'PropertiesChanged', 'org.bluez.Device1')
+        self.assertEqual(accepted, {'Connected', 'Paired'})
+
+    def test_accept_configured_device_rssi(self):
+        accepted = self.bus.accept('/ad/dev1', 'org.freedesktop.DBus.Properties', 'PropertiesChanged', 'org.bluez.Device1')
+        self.assertEqual(accepted, {'Connected', 'Paired', 'RSSI'})
+
+    def test_change_rssi(self):
+        self.send_properties_changed('/ad/dev1', 'org.bluez.Device1', {
+            'RSSI': dbus_next.Variant('n', -60)
+        })
+        self.listener.device_seen.assert_called_once_with('00:11:22:33:44:55', -60)
+
+    def test_change_rssi_unconfigured_device(self):
+        self.send_properties_changed('/ad/dev2', 'org.bluez.Device1', {
+            'RSSI': dbus_next.Variant('n', -60)
+        })
+        self.listener.device_seen.assert_not_called()
+
+    def test_add_device_with_rssi(self):
+        self.send_interfaces_added('/ad/dev3', {
+            'org.bluez.Device1': {
+                'Address': dbus_next.Variant('s', '00:11:22:33:44:55'),
+                'Connected': dbus_next.Variant('b', False),
+                'Paired': dbus_next.Variant('b', False),
+                'RSSI': dbus_next.Variant('n', -70)
+            }
+        })
+        self.listener.update_paired.assert_called_with('00:11:22:33:44:55', False)
+        self.listener.device_seen.assert_called_once_with('00:11:22:33:44:55', -70)
+
+    def test_change_paired(self):
+        self.send_properties_changed('/ad/dev1', 'org.bluez.Device1', {
+            'Paired': dbus_next.Variant('b', True)
+        })
+        self.listener.update_paired.assert_called_with('00:11:22:33:44:55', True)
+
+    def test_reject_unknown_device_properties(self):
+        self.assertFalse(self.bus.accept('/ad/dev9', 'org.freedesktop.DBus.Properties', 'PropertiesChanged', 'org.bluez.Device1'))
+
+    def test_reject_ignored_signals(self):
+        self.assertFalse(self.bus.accept('/ad/dev1', 'org.freedesktop.DBus.Properties', 'PropertiesChanged', 'org.bluez.MediaTransport1'))
+        self.assertFalse(self.bus.accept('/', 'org.random', 'SomeOtherSignal', None))
+
     def test_change_property_on_ignored_interface(self):
         self.send_properties_changed('/ad/dev1', 'org.random.Interface', {
             'Connected': dbus_next.Variant('b', True)
@@ -135,6 +222,17 @@ class BluezAdapterTest(unittest.TestCase):
             'body': [{'key': 'value'}]
         })
     
+    def test_set_powered(self):
+        self.loop.run_until_complete(self.adapter.set_powered(True))
+        self.bus.assert_call('call', {
+            'destination': 'org.bluez',
+            'path': '/path',
+            'interface': 'org.freedesktop.DBus.Properties',
+            'member': 'Set',
+            'signature': 'ssv',
+            'body': ['org.bluez.Adapter1', 'Powered', dbus_next.Variant('b', True)]
+        })
+
     def test_start_discovery(self):
         self.loop.run_until_complete(self.adapter.start_discovery())
         self.bus.assert_call('call', {
@@ -209,15 +307,99 @@ class BluezDeviceTest(unittest.TestCase):
         })
 
 
+class BluezAgentTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.bus = MockBus(self)
+        self.listener = unittest.mock.Mock()
+        self.listener.accepts_pairing.side_effect = lambda address: address == '00:11:22:33:44:55'
+        self.client = self.loop.run_until_complete(bluez.connect(self.bus, self.listener))
+        self.bus.calls.clear()
+        self.agent = bluez.Agent(self.bus, self.client, self.listener, 'DisplayYesNo')
+
+    def call_method(self, name, *args):
+        for method in dbus_next.service.ServiceInterface._get_methods(self.agent):
+            if method.name == name:
+                return method.fn(self.agent, *args)
+        self.fail(f'{name} not exported')
+
+    def test_register(self):
+        self.loop.run_until_complete(self.agent.register())
+        self.assertIs(self.bus.exported['/bluerepair/agent'], self.agent)
+        self.bus.assert_call('call', {
+            'destination': 'org.bluez',
+            'path': '/org/bluez',
+            'interface': 'org.bluez.AgentManager1',
+            'member': 'RegisterAgent',
+            'signature': 'os',
+            'body': ['/bluerepair/agent', 'DisplayYesNo']
+        })
+        self.bus.assert_call('call', {
+            'destination': 'org.bluez',
+            'path': '/org/bluez',
+            'interface': 'org.bluez.AgentManager1',
+            'member': 'RequestDefaultAgent',
+            'signature': 'o',
+            'body': ['/bluerepair/agent']
+        })
+
+    def test_unregister(self):
+        self.loop.run_until_complete(self.agent.register())
+        self.bus.calls.clear()
+        self.loop.run_until_complete(self.agent.unregister())
+        self.assertNotIn('/bluerepair/agent', self.bus.exported)
+        self.bus.assert_call('call', {
+            'destination': 'org.bluez',
+            'path': '/org/bluez',
+            'interface': 'org.bluez.AgentManager1',
+            'member': 'UnregisterAgent',
+            'signature': 'o',
+            'body': ['/bluerepair/agent']
+        })
+
+    def test_confirm_configured_device(self):
+        self.assertIsNone(self.call_method('RequestConfirmation', '/ad/dev1', 123456))
+        self.assertIsNone(self.call_method('RequestAuthorization', '/ad/dev1'))
+        self.assertIsNone(self.call_method('AuthorizeService', '/ad/dev1', '00001124-0000-1000-8000-00805f9b34fb'))
+        self.assertEqual(self.call_method('RequestPinCode', '/ad/dev1'), '0000')
+        self.assertEqual(self.call_method('RequestPasskey', '/ad/dev1'), 0)
+
+    def test_reject_unconfigured_device(self):
+        with self.assertRaises(dbus_next.DBusError) as cm:
+            self.call_method('RequestConfirmation', '/ad/dev2', 123456)
+        self.assertEqual(cm.exception.type, 'org.bluez.Error.Rejected')
+
+    def test_reject_unknown_path(self):
+        with self.assertRaises(dbus_next.DBusError):
+            self.call_method('RequestAuthorization', '/ad/dev9')
+
+    def test_stats(self):
+        self.call_method('RequestConfirmation', '/ad/dev1', 123456)
+        with self.assertRaises(dbus_next.DBusError):
+            self.call_method('RequestConfirmation', '/ad/dev2', 123456)
+        stats = self.agent.get_stats()['RequestConfirmation']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertGreaterEqual(stats['max'], 0)
+
+
 class MockBus:
     def __init__(self, test):
         self.test = test
         self.calls = []
         self.handler = None
+        self.exported = {}
+
+    def export(self, path, interface):
+        self.exported[path] = interface
+
+    def unexport(self, path):
+        del self.exported[path]
 
-    def add_message_handler(self, handler):
+    def add_message_handler(self, handler, accept=None):
         self.calls.append(('add_message_handler', handler))
         self.handler = handler
+        self.accept = accept
 
     def remove_message_handler(self, handler):
         self.calls.append(('remove_message_handler', handler))
@@ -268,7 +450,7 @@ class MockRacingBus:
     def __init__(self):
         self.handler = None
 
-    def add_message_handler(self, handler):
+    def add_message_handler(self, handler, accept=None):
         self.handler = handler
 
     async def call(self, destination, path, interface, member, signature='', body=[]):
@@ -0,0 +1,106 @@
+import bus
+import dbus_next
+import io
+import unittest
+import unittest.mock
+
+
+class SignalFilteringUnmarshallerTest(unittest.TestCase):
+    def setUp(self):
+        self.accepted = []
+
+    def accept(self, path, interface, member, arg0):
+        self.accepted.append((path, interface, member, arg0))
+        if member == 'PropertiesChanged' and arg0 == 'org.bluez.Device1':
+            return {'Connected'}
+        return member == 'InterfacesAdded'
+
+    def unmarshall(self, *messages):
+        stream = io.BytesIO(b''.join(m._marshall() for m in messages))
+        unmarshaller = bus.SignalFilteringUnmarshaller(stream, None, self.accept)
+        result = []
+        while True:
+            try:
+                msg = unmarshaller.unmarshall()
+            except EOFError:
+                break
+            result.append(msg)
+            unmarshaller = bus.SignalFilteringUnmarshaller(stream, None, self.accept)
+        return result
+
+    def properties_changed(self, interface, changed):
+        return dbus_next.Message.new_signal('/ad/dev1', 'org.freedesktop.DBus.Properties', 'PropertiesChanged',
+                                            'sa{sv}as', [interface, changed, []])
+
+    def test_decode_accepted_signal(self):
+        msg = self.properties_changed('org.bluez.Device1', {
+            'RSSI': dbus_next.Variant('n', -60),
+            'Connected': dbus_next.Variant('b', True)
+        })
+        [result] = self.unmarshall(msg)
+        self.assertEqual(result.member, 'PropertiesChanged')
+        self.assertEqual(result.body[0], 'org.bluez.Device1')
+        self.assertEqual(result.body[1]['Connected'].value, True)
+        self.assertEqual(self.accepted, [('/ad/dev1', 'org.freedesktop.DBus.Properties', 'PropertiesChanged', 'org.bluez.Device1')])
+
+    def test_drop_unwanted_properties(self):
+        rssi = self.properties_changed('org.bluez.Device1', {
+            'RSSI': dbus_next.Variant('n', -60),
+            'ManufacturerData': dbus_next.Variant('a{qv}', {76: dbus_next.Variant('ay', bytes(24))})
+        })
+        connected = self.properties_changed('org.bluez.Device1', {'Connected': dbus_next.Variant('b', False)})
+        [result] = self.unmarshall(rssi, connected)
+        self.assertEqual(result.body[1]['Connected'].value, False)
+
+    def test_drop_unwanted_interface(self):
+        msg = self.properties_changed('org.bluez.MediaTransport1', {'Volume': dbus_next.Variant('q', 10)})
+        added = dbus_next.Message.new_signal('/', 'org.freedesktop.DBus.ObjectManager', 'InterfacesAdded',
+                                             'oa{sa{sv}}', ['/ad/dev2', {}])
+        [result] = self.unmarshall(msg, msg, added)
+        self.assertEqual(result.member, 'InterfacesAdded')
+        self.assertEqual(result.body, ['/ad/dev2', {}])
+
+    def test_method_return_not_filtered(self):
+        call = dbus_next.Message(destination='org.bluez', path='/', interface='org.random', member='Get', serial=1)
+        reply = dbus_next.Message.new_method_return(call, 's', ['value'])
+        [result] = self.unmarshall(reply)
+        self.assertEqual(result.body, ['value'])
+        self.assertEqual(self.accepted, [])
+
+
+class BusAcceptTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = bus.Bus.__new__(bus.Bus)
+        self.bus._handlers = {}
+
+    def test_no_filter_accepts_everything(self):
+        self.bus.add_message_handler(lambda *_: None)
+        self.assertTrue(self.bus._accept_signal('/', 'org.random', 'Signal', None))
+
+    def test_union_of_properties(self):
+        self.bus.add_message_handler(lambda *_: None, lambda *_: {'Connected'})
+        self.bus.add_message_handler(lambda *_: None, lambda *_: {'RSSI'})
+        self.bus.add_message_handler(lambda *_: None, lambda *_: False)
+        self.assertEqual(self.bus._accept_signal('/', 'org.random', 'Signal', None), {'Connected', 'RSSI'})
+
+    def test_reject(self):
+        self.bus.add_message_handler(lambda *_: None, lambda *_: False)
+        self.assertFalse(self.bus._accept_signal('/', 'org.random', 'Signal', None))
+
+
+class BusInitTest(unittest.TestCase):
+    def test_filtering_unmarshaller(self):
+        message_bus = unittest.mock.Mock(_stream=io.BytesIO(), _sock=None, _negotiate_unix_fd=False)
+        with unittest.mock.patch('dbus_next.aio.MessageBus', return_value=message_bus):
+            b = bus.Bus()
+        self.assertIsInstance(message_bus._unmarshaller, bus.SignalFilteringUnmarshaller)
+        self.assertIsInstance(message_bus._create_unmarshaller(), bus.SignalFilteringUnmarshaller)
+        self.assertEqual(b._bus, message_bus)
+
+    def test_fallback_without_private_attributes(self):
+        message_bus = unittest.mock.Mock(spec=['connect', 'disconnect', 'call'])
+        with unittest.mock.patch('dbus_next.aio.MessageBus', return_value=message_bus):
+            with self.assertLogs('bus', 'WARNING'):
+                b = bus.Bus()
+        self.assertFalse(hasattr(message_bus, '_unmarshaller'))
+        self.assertEqual(b._bus, message_bus)
@@ -0,0 +1,120 @@
+import async_mock
+import asyncio
+import cli
+import device_manager
+import unittest
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.here_address = '00:11:22:33:44:55'
+        self.there_address = '66:77:88:99:AA:BB'
+        self.nowhere_address = 'CC:DD:EE:FF:00:11'
+        self.devman = device_manager.DeviceManager([
+            {'name': 'Here', 'address': self.here_address},
+            {'name': 'There', 'address': self.there_address},
+            {'name': 'Nowhere', 'address': self.nowhere_address}
+        ], MockTimeout(), MockTimeout())
+        self.devman.add_adapter(MockAdapter())
+        self.here_device = MockDevice(self.devman, self.here_address)
+        self.devman.add_device(self.here_address, self.here_device, False)
+        self.there_device = MockDevice(self.devman, self.there_address)
+        self.devman.add_device(self.there_address, self.there_device, True)
+        self.messages = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_cli(self, command, addresses, timeout=1):
+        return self.loop.run_until_complete(cli.run(self.devman, command, addresses, timeout, self.messages.append))
+
+    def results(self):
+        return {m['address']: m['code'] for m in self.messages if m['event'] == 'result'}
+
+    def test_status(self):
+        self.assertEqual(self.run_cli('status', []), {
+            self.here_address: cli.OK,
+            self.there_address: cli.OK,
+            self.nowhere_address: cli.OK
+        })
+        self.assertEqual([(m['address'], m['state']) for m in self.messages], [
+            (self.here_address, 'disconnected'),
+            (self.there_address, 'connected'),
+            (self.nowhere_address, 'disconnected')
+        ])
+
+    def test_status_unknown(self):
+        self.assertEqual(self.run_cli('status', ['11:11:11:11:11:11']), {'11:11:11:11:11:11': cli.UNKNOWN_DEVICE})
+
+    def test_connect_many(self):
+        results = self.run_cli('connect', [self.here_address, self.nowhere_address, '11:11:11:11:11:11'])
+        self.assertEqual(results, {
+            self.here_address: cli.OK,
+            self.nowhere_address: cli.FAILED,
+            '11:11:11:11:11:11': cli.UNKNOWN_DEVICE
+        })
+        self.assertEqual(self.results(), results)
+        states = [m['state'] for m in self.messages if m['event'] == 'state' and m['address'] == self.here_address]
+        self.assertEqual(states, ['disconnected', 'connecting', 'connected'])
+
+    def test_disconnect(self):
+        self.assertEqual(self.run_cli('disconnect', [self.there_address]), {self.there_address: cli.OK})
+        self.assertEqual(self.there_device.calls, ['disconnect'])
+
+    def test_failure(self):
+        self.there_device.fail = True
+        results = self.run_cli('disconnect', [self.there_address])
+        self.assertEqual(results, {self.there_address: cli.FAILED})
+        self.assertIn('error', self.messages[-1])
+
+    def test_timeout(self):
+        self.there_device.hang = True
+        self.assertEqual(self.run_cli('disconnect', [self.there_address], timeout=0.01), {self.there_address: cli.TIMED_OUT})
+
+
+class MockAdapter:
+    async def remove_device(self, device):
+        pass
+
+    async def set_discovery_filter(self, filter={}):
+        pass
+
+    async def start_discovery(self):
+        pass
+
+    async def stop_discovery(self):
+        pass
+
+
+class MockDevice:
+    def __init__(self, devman, address):
+        self.devman = devman
+        self.address = address
+        self.calls = []
+        self.fail = False
+        self.hang = False
+
+    async def pair(self):
+        self.calls.append('pair')
+
+    async def trust(self):
+        self.calls.append('trust')
+
+    async def connect(self):
+        self.calls.append('connect')
+        asyncio.get_event_loop().call_soon(self.devman.update_device, self.address, True)
+
+    async def disconnect(self):
+        self.calls.append('disconnect')
+        if self.fail:
+            raise RuntimeError('org.bluez.Error.Failed')
+        if self.hang:
+            await asyncio.sleep(1)
+        asyncio.get_event_loop().call_soon(self.devman.update_device, self.address, False)
+
+
+class MockTimeout:
+    @async_mock.async_mock_method
+    async def wait_event(self, event):
+        pass
@@ -45,17 +45,20 @@ class DeviceManagerTest(unittest.TestCase):
             {
                 'name': 'Here',
                 'address': self.here_address,
-                'state': here_state
+                'state': here_state,
+                'in_range': here_state != 'disconnected'
             },
             {
                 'name': 'There',
                 'address': self.there_address,
-                'state': there_state
+                'state': there_state,
+                'in_range': there_state != 'disconnected'
             },
             {
                 'name': 'Nowhere',
                 'address': self.nowhere_address,
-                'state': nowhere_state
+                'state': nowhere_state,
+                'in_range': nowhere_state != 'disconnected'
             }
         ])
 
@@ -101,6 +104,19 @@ class DeviceManagerTest(unittest.TestCase):
             'connect'
         ])
 
+    def test_connect_pipeline_stats(self):
+        self.run_async(self.devman.connect(self.here_address))
+        stats = self.devman.get_stats()['pipeline']
+        self.assertEqual(stats['repairs'], 1)
+        self.assertGreaterEqual(stats['saved_total'], 0)
+        self.assertIsNotNone(stats['last_saved'])
+
+    def test_connect_many(self):
+        self.devman.update_device(self.there_address, False)
+        self.run_async(self.devman.connect_many([self.here_address, self.there_address]))
+        self.assertEqual(self.here_device.calls, ['pair', 'trust', 'connect'])
+        self.assertEqual(self.there_device.calls, ['pair', 'trust', 'connect'])
+
     def test_disconnect(self):
         self.run_async(self.devman.disconnect(self.there_address))
         self.assertEqual(self.here_device.calls, [])
@@ -134,6 +150,49 @@ class DeviceManagerTest(unittest.TestCase):
         self.assertIn(('stop_discovery', []), self.adapter.calls)
         self.assertEqual(len(self.adapter.calls), 5)
 
+    def test_connect_present_unpaired_skips_discovery(self):
+        self.devman.update_paired(self.here_address, False)
+        self.devman.device_seen(self.here_address, -50)
+        self.run_async(self.devman.connect(self.here_address))
+        self.assertEqual(self.adapter.calls, [])
+        self.assertEqual(self.here_device.calls, ['pair', 'trust', 'connect'])
+        self.assertEqual(self.devman.get_stats()['presence']['skipped_discovery'], 1)
+
+    def test_connect_present_paired_rediscovers(self):
+        self.adapter_timeout.wait_event.side_effect = [lambda *_: self.devman.remove_device(self.here_address)]
+        self.devman.update_paired(self.here_address, True)
+        self.devman.device_seen(self.here_address, -50)
+        self.run_async(self.devman.connect(self.here_address))
+        self.assertEqual(self.adapter.calls[0], ('remove_device', [self.here_device]))
+        self.assertEqual(self.devman.get_stats()['presence']['skipped_discovery'], 0)
+
+    def test_connect_absent_unpaired_rediscovers(self):
+        self.adapter_timeout.wait_event.side_effect = [lambda *_: self.devman.remove_device(self.here_address)]
+        self.devman.update_paired(self.here_address, False)
+        self.run_async(self.devman.connect(self.here_address))
+        self.assertEqual(self.adapter.calls[0], ('remove_device', [self.here_device]))
+
+    def test_publish_in_range(self):
+        with self.devman.subscribe() as q:
+            q.get_nowait()
+            self.devman.device_seen(self.nowhere_address, -80)
+            self.devman.device_seen(self.nowhere_address, -70)
+            devices = q.get_nowait()
+            self.assertTrue(q.empty())
+        self.assertTrue(devices[2]['in_range'])
+        self.assertFalse(devices[0]['in_range'])
+        self.assertEqual(self.devman.get_stats()['presence']['devices'][self.nowhere_address]['rssi'], -70)
+
+    def test_connected_device_not_away(self):
+        there = self.devman.get_devices()[1]
+        self.assertEqual(there['state'], 'connected')
+        self.assertTrue(there['in_range'])
+        self.assertNotIn(self.there_address, self.devman.get_presence())
+
+    def test_device_seen_unconfigured(self):
+        self.devman.device_seen('01:02:03:04:05:06', -40)
+        self.assertEqual(self.devman.get_stats()['presence']['devices'], {})
+
     def test_connect_already_discovered_sets_event(self):
         calls = 0
         def connect_and_check_event(instance, event):
@@ -168,6 +227,81 @@ class DeviceManagerTest(unittest.TestCase):
         self.run_async(self.devman.connect(self.there_address))
         self.assertEqual(calls, 1)
 
+    def test_connect_adapter_powered_off(self):
+        self.devman.update_adapter(self.adapter, {'Powered': False})
+        with self.devman.subscribe() as q:
+            q.get_nowait()
+            self.run_async(self.devman.connect(self.here_address))
+            self.assert_devices(q.get_nowait(), here_state='connecting')
+            self.assert_devices(q.get_nowait(), here_state='disconnected')
+        self.assertEqual(self.adapter.calls, [])
+        self.assertEqual(self.here_device.calls, [])
+
+    def test_connect_no_adapter(self):
+        self.devman.remove_adapter(self.adapter)
+        self.run_async(self.devman.connect(self.here_address))
+        self.assertEqual(self.adapter.calls, [])
+        self.assert_devices(self.devman.get_devices())
+
+    def test_connect_auto_power_on(self):
+        devman = device_manager.DeviceManager([{'name': 'Here', 'address': self.here_address}],
+                                              self.adapter_timeout, self.scan_timeout, auto_power_on=True)
+        devman.add_adapter(self.adapter)
+        devman.update_adapter(self.adapter, {'Powered': False})
+        devman.add_device(self.here_address, self.here_device, False)
+        self.run_async(devman.connect(self.here_address))
+        self.assertEqual(self.adapter.calls[0], ('set_powered', [True]))
+        self.assertEqual(self.here_device.calls, ['pair', 'trust', 'connect'])
+
+    def test_connect_auto_power_on_blocked(self):
+        devman = device_manager.DeviceManager([{'name': 'Here', 'address': self.here_address}],
+                                              self.adapter_timeout, self.scan_timeout, auto_power_on=True)
+        self.adapter.blocked = True
+        devman.add_adapter(self.adapter)
+        devman.update_adapter(self.adapter, {'Powered': False})
+        devman.add_device(self.here_address, self.here_device, False)
+        self.run_async(devman.connect(self.here_address))
+        self.assertEqual(self.adapter.calls, [('set_powered', [True])])
+        self.assertEqual(self.here_device.calls, [])
+        self.assertEqual(devman.get_devices()[0]['state'], 'disconnected')
+
+    def test_health(self):
+        self.assertTrue(self.devman.get_health()['ready'])
+        self.devman.update_adapter(self.adapter, {'Powered': False, 'Discovering': False})
+        self.assertEqual(self.devman.get_health(), {
+            'ready': False,
+            'adapter': True,
+            'powered': False,
+            'discovering': False,
+            'discoverable': None
+        })
+        self.devman.update_adapter(self.adapter, {'Powered': True})
+        self.assertTrue(self.devman.get_health()['ready'])
+        self.devman.update_adapter(MockAdapter(), {'Powered': False})
+        self.assertTrue(self.devman.get_health()['ready'])
+        self.devman.remove_adapter(self.adapter)
+        self.assertFalse(self.devman.get_health()['ready'])
+
+    def test_journal_connect(self):
+        device = MockDevice()
+        self.scan_timeout.wait_event.side_effect = [lambda *_: self.devman.add_device(self.nowhere_address, device, False)]
+        self.run_async(self.devman.connect(self.nowhere_address))
+        self.devman.update_device(self.nowhere_address, True)
+        entries = [(e['kind'], e['value']) for e in self.devman.get_journal() if e['address'] == self.nowhere_address]
+        self.assertEqual(entries, [
+            ('state', 'connecting'),
+            ('phase', 'discover'),
+            ('phase', 'pair'),
+            ('phase', 'trust'),
+            ('phase', 'connect'),
+            ('state', 'connected')
+        ])
+
+    def test_journal_since(self):
+        last = self.devman.get_journal()[-1]['seq']
+        self.devman.update_device(self.here_address, True)
+        self.assertEqual([e['value'] for e in self.devman.get_journal(last)], ['connected'])
+
     def test_subscribe(self):
         with self.devman.subscribe() as q:
             devices = q.get_nowait()
@@ -241,6 +375,12 @@ class DeviceManagerTest(unittest.TestCase):
 class MockAdapter:
     def __init__(self):
         self.calls = []
+        self.blocked = False
+
+    async def set_powered(self, powered):
+        self.calls.append(('set_powered', [powered]))
+        if self.blocked:
+            raise RuntimeError('org.bluez.Error.Blocked: Blocked through rfkill')
 
     async def remove_device(self, device):
         self.calls.append(('remove_device', [device]))
@@ -0,0 +1,154 @@
+import async_mock
+import asyncio
+import discovery
+import unittest
+
+
+class DiscoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.scan_timeout = MockTimeout()
+        self.adapter = MockAdapter()
+        self.discovery = discovery.Discovery(self.scan_timeout, scan_window=0.01, scan_interval=0.02)
+        self.discovery.set_adapter(self.adapter)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, aw):
+        return self.loop.run_until_complete(aw)
+
+    def test_find(self):
+        event = asyncio.Event()
+        self.assertFalse(self.run_async(self.discovery.find('addr', event)))
+        self.assertEqual(self.adapter.calls, ['set_discovery_filter', 'start_discovery', 'stop_discovery'])
+        self.assertFalse(self.discovery.is_scanning())
+
+    def test_find_discovered(self):
+        event = asyncio.Event()
+        self.scan_timeout.wait_event.side_effect = [lambda *_: event.set()]
+        self.assertTrue(self.run_async(self.discovery.find('addr', event)))
+
+    def test_wanted_while_waiting(self):
+        def check_wanted(*_):
+            self.assertTrue(self.discovery.is_wanted('addr'))
+            self.assertFalse(self.discovery.is_wanted('other'))
+        self.scan_timeout.wait_event.side_effect = [check_wanted]
+        self.run_async(self.discovery.find('addr', asyncio.Event()))
+        self.assertFalse(self.discovery.is_wanted('addr'))
+
+    def test_shared_session(self):
+        self.adapter.start_discovery.side_effect = [self.discovery.find('other', asyncio.Event())]
+        self.run_async(self.discovery.find('addr', asyncio.Event()))
+        self.assertEqual(self.adapter.calls, ['set_discovery_filter', 'start_discovery', 'stop_discovery'])
+
+    def test_timeout_stops_discovery(self):
+        def timeout(*_):
+            raise asyncio.TimeoutError()
+        self.scan_timeout.wait_event.side_effect = [timeout]
+        self.assertFalse(self.run_async(self.discovery.find('addr', asyncio.Event())))
+        self.assertEqual(self.adapter.calls, ['set_discovery_filter', 'start_discovery', 'stop_discovery'])
+        self.assertFalse(self.discovery.is_wanted('addr'))
+
+    def test_error_stops_discovery(self):
+        def error(*_):
+            raise RuntimeError()
+        self.scan_timeout.wait_event.side_effect = [error]
+        with self.assertRaises(RuntimeError):
+            self.run_async(self.discovery.find('addr', asyncio.Event()))
+        self.assertEqual(self.adapter.calls, ['set_discovery_filter', 'start_discovery', 'stop_discovery'])
+        self.assertFalse(self.discovery.is_wanted('addr'))
+
+    def test_start_error_does_not_leak(self):
+        def error(*_):
+            raise RuntimeError()
+        self.adapter.start_discovery.side_effect = [error]
+        with self.assertRaises(RuntimeError):
+            self.run_async(self.discovery.find('addr', asyncio.Event()))
+        self.assertFalse(self.discovery.is_scanning())
+        self.assertFalse(self.discovery.is_wanted('addr'))
+        self.adapter.calls.clear()
+        self.run_async(self.discovery.find('addr', asyncio.Event()))
+        self.assertEqual(self.adapter.calls, ['set_discovery_filter', 'start_discovery', 'stop_discovery'])
+
+    def test_background_duty_cycle(self):
+        async def wait_cycles():
+            await asyncio.sleep(0.1)
+        self.scan_timeout.wait_event.side_effect = [wait_cycles()]
+        self.run_async(self.discovery.find('addr', asyncio.Event(), background=True))
+        self.assertGreater(self.adapter.calls.count('start_discovery'), 1)
+        self.assertGreater(self.adapter.calls.count('stop_discovery'), 1)
+        self.assertFalse(self.discovery.is_scanning())
+
+    def test_background_start_error_retries(self):
+        async def wait_cycles():
+            await asyncio.sleep(0.1)
+        def error(*_):
+            raise RuntimeError()
+        self.adapter.start_discovery.side_effect = [error]
+        self.scan_timeout.wait_event.side_effect = [wait_cycles()]
+        with self.assertLogs('discovery'):
+            self.run_async(self.discovery.find('addr', asyncio.Event(), background=True))
+        self.assertGreater(self.adapter.calls.count('start_discovery'), 2)
+        self.assertFalse(self.discovery.is_scanning())
+
+    def test_background_task_cleared_on_exit(self):
+        async def cancel_duty_cycle():
+            await asyncio.sleep(0.015)
+            self.discovery._duty_cycle_task.cancel()
+            await asyncio.sleep(0)
+            self.assertIsNone(self.discovery._duty_cycle_task)
+        self.scan_timeout.wait_event.side_effect = [cancel_duty_cycle()]
+        self.run_async(self.discovery.find('addr', asyncio.Event(), background=True))
+
+    def test_active_waiter_overrides_duty_cycle(self):
+        async def find_active():
+            await asyncio.sleep(0.015)
+            self.adapter.calls.clear()
+            self.scan_timeout.wait_event.side_effect = [self.assert_continuous_scan()]
+            await self.discovery.find('other', asyncio.Event())
+        self.scan_timeout.wait_event.side_effect = [find_active()]
+        self.run_async(self.discovery.find('addr', asyncio.Event(), background=True))
+
+    def test_active_waiter_during_background_start(self):
+        self.adapter.filter_delay = 0.02
+        async def find_active():
+            await asyncio.sleep(0.005)
+            self.scan_timeout.wait_event.side_effect = [self.assert_scan_started()]
+            await self.discovery.find('other', asyncio.Event())
+        self.scan_timeout.wait_event.side_effect = [find_active()]
+        self.run_async(self.discovery.find('addr', asyncio.Event(), background=True))
+        self.assertEqual(self.adapter.calls.count('start_discovery'), self.adapter.calls.count('stop_discovery'))
+
+    async def assert_scan_started(self):
+        self.assertTrue(self.discovery.is_scanning())
+        self.assertEqual(self.adapter.calls[-2:], ['set_discovery_filter', 'start_discovery'])
+        self.assertNotIn('stop_discovery', self.adapter.calls)
+
+    async def assert_continuous_scan(self):
+        await asyncio.sleep(0.05)
+        self.assertTrue(self.discovery.is_scanning())
+        self.assertNotIn('stop_discovery', self.adapter.calls)
+
+
+class MockAdapter:
+    def __init__(self):
+        self.calls = []
+        self.filter_delay = 0
+
+    async def set_discovery_filter(self, filter={}):
+        self.calls.append('set_discovery_filter')
+        await asyncio.sleep(self.filter_delay)
+
+    @async_mock.async_mock_method
+    async def start_discovery(self):
+        self.calls.append('start_discovery')
+
+    async def stop_discovery(self):
+        self.calls.append('stop_discovery')
+
+
+class MockTimeout:
+    @async_mock.async_mock_method
+    async def wait_event(self, event):
+        pass
@@ -0,0 +1,32 @@
+import asyncio
+import bluez
+import device_manager
+import fake_bus
+import unittest
+
+
+class FakeBusTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.address = '00:11:22:33:44:55'
+        self.bus = fake_bus.FakeBus([self.address])
+        self.devman = device_manager.DeviceManager([{'name': 'Here', 'address': self.address}],
+                                                   device_manager.Timeout(1), device_manager.Timeout(1))
+        self.client = self.loop.run_until_complete(bluez.connect(self.bus, self.devman))
+
+    def tearDown(self):
+        self.loop.close()
+
+    def state(self):
+        return self.devman.get_devices()[0]['state']
+
+    def test_repair(self):
+        self.loop.run_until_complete(self.devman.connect(self.address))
+        self.assertEqual(self.state(), 'connected')
+        self.assertTrue(self.devman.get_health()['ready'])
+
+    def test_disconnect(self):
+        self.bus.set_connected(self.address, True)
+        self.assertEqual(self.state(), 'connected')
+        self.loop.run_until_complete(self.devman.disconnect(self.address))
+        self.assertEqual(self.state(), 'disconnected')
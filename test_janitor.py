@@ -0,0 +1,68 @@
+import asyncio
+import bluez
+import device_manager
+import fake_bus
+import janitor
+import unittest
+
+
+class JanitorTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.configured = '00:11:22:33:44:55'
+        self.paired = '00:00:00:00:00:01'
+        self.connected = '00:00:00:00:00:02'
+        self.strangers = [f'00:00:00:00:01:{i:02X}' for i in range(5)]
+        self.bus = fake_bus.FakeBus([self.configured, self.paired, self.connected] + self.strangers)
+        self.bus.set_paired(self.paired, True)
+        self.bus.set_connected(self.connected, True)
+        self.devman = device_manager.DeviceManager([{'name': 'Here', 'address': self.configured}],
+                                                   device_manager.Timeout(1), device_manager.Timeout(1))
+        self.client = self.loop.run_until_complete(bluez.connect(self.bus, self.devman))
+        self.janitor = janitor.Janitor(self.client, self.devman, batch_size=2, batch_pause=0)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def remaining(self):
+        return sorted(self.client.get_address(path) for path in self.bus.device_paths())
+
+    def test_prune(self):
+        self.loop.run_until_complete(self.janitor.prune())
+        self.assertEqual(self.remaining(), sorted([self.configured, self.paired, self.connected]))
+        stats = self.janitor.get_stats()
+        self.assertEqual(stats['pruned'], 5)
+        self.assertEqual(stats['objects'], 4)
+        self.assertEqual(stats['startup_objects'], 9)
+        self.assertGreater(stats['startup_seconds_saved'], 0)
+
+    def test_prune_after_unpair(self):
+        self.bus.set_paired(self.paired, False)
+        self.loop.run_until_complete(self.janitor.prune())
+        self.assertNotIn(self.paired, self.remaining())
+
+    def test_keep_device_paired_during_pause(self):
+        self.janitor = janitor.Janitor(self.client, self.devman, batch_size=2, batch_pause=0.05)
+
+        async def pair_during_pause():
+            await asyncio.sleep(0.01)
+            self.bus.set_paired(self.strangers[4], True)
+
+        async def prune():
+            await asyncio.gather(self.janitor.prune(), pair_during_pause())
+        self.loop.run_until_complete(prune())
+        self.assertIn(self.strangers[4], self.remaining())
+        self.assertEqual(self.janitor.get_stats()['pruned'], 4)
+
+    def test_failed_removal_not_retried(self):
+        async def fail(device):
+            raise RuntimeError('org.bluez.Error.Failed: busy')
+        for adapter, _ in self.client.get_stale_devices(set()):
+            adapter.remove_device = fail
+        self.loop.run_until_complete(self.janitor.prune())
+        self.assertEqual(self.janitor.get_stats()['failed'], 5)
+
+    def test_skip_while_discovering(self):
+        self.devman.update_adapter(self.client._adapters[self.bus.adapter_path], {'Discovering': True})
+        self.loop.run_until_complete(self.janitor.prune())
+        self.assertEqual(self.janitor.get_stats()['pruned'], 0)
@@ -0,0 +1,71 @@
+import journal
+import os
+import tempfile
+import unittest
+
+
+class JournalTest(unittest.TestCase):
+    def test_append(self):
+        j = journal.Journal()
+        entry = j.append('state', '00:11:22:33:44:55', 'connecting')
+        self.assertEqual(entry['seq'], 1)
+        self.assertEqual(entry['kind'], 'state')
+        self.assertEqual(entry['address'], '00:11:22:33:44:55')
+        self.assertEqual(entry['value'], 'connecting')
+        self.assertIsInstance(entry['time'], float)
+        self.assertEqual(j.last_seq(), 1)
+
+    def test_since(self):
+        j = journal.Journal()
+        for value in ['a', 'b', 'c', 'd']:
+            j.append('phase', 'addr', value)
+        self.assertEqual([e['value'] for e in j.since(0)], ['a', 'b', 'c', 'd'])
+        self.assertEqual([e['value'] for e in j.since(2)], ['c', 'd'])
+        self.assertEqual([e['value'] for e in j.since(1, limit=2)], ['b', 'c'])
+        self.assertEqual(j.since(4), [])
+
+    def test_bounded(self):
+        j = journal.Journal(capacity=3)
+        for value in ['a', 'b', 'c', 'd', 'e']:
+            j.append('phase', 'addr', value)
+        self.assertEqual(j.first_seq(), 3)
+        self.assertEqual([e['seq'] for e in j.since(0)], [3, 4, 5])
+        self.assertEqual([e['value'] for e in j.since(3)], ['d', 'e'])
+
+
+class JournalFileTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'journal')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_survives_restart(self):
+        j = journal.Journal(capacity=3, path=self.path)
+        for value in ['a', 'b', 'c', 'd']:
+            j.append('state', 'addr', value)
+        j.close()
+        j = journal.Journal(capacity=3, path=self.path)
+        self.assertEqual([(e['seq'], e['value']) for e in j.since(0)], [(2, 'b'), (3, 'c'), (4, 'd')])
+        self.assertEqual(j.append('state', 'addr', 'e')['seq'], 5)
+        j.close()
+
+    def test_skips_torn_records(self):
+        j = journal.Journal(capacity=3, path=self.path)
+        for value in ['a', 'b', 'c']:
+            j.append('state', 'addr', value)
+        journal._RECORD.pack_into(j._map, journal._HEADER.size + journal._RECORD.size * 2,
+                                  0, 0.0, b'', b'', b'')
+        j.close()
+        j = journal.Journal(capacity=3, path=self.path)
+        self.assertEqual([e['value'] for e in j.since(0)], ['a', 'c'])
+        j.close()
+
+    def test_capacity_change_resets(self):
+        j = journal.Journal(capacity=3, path=self.path)
+        j.append('state', 'addr', 'a')
+        j.close()
+        j = journal.Journal(capacity=4, path=self.path)
+        self.assertEqual(j.since(0), [])
+        j.close()
@@ -0,0 +1,160 @@
+import asyncio
+import bluez
+import device_manager
+import fake_bus
+import json
+import peers
+import socket
+import unittest
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class PeersTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.address = '00:11:22:33:44:55'
+        ports = [free_port() for _ in range(2)]
+        self.nodes = []
+        for name, port, other in [('a', ports[0], ports[1]), ('b', ports[1], ports[0])]:
+            bus = fake_bus.FakeBus([self.address])
+            devman = device_manager.DeviceManager([{'name': 'Here', 'address': self.address}],
+                                                  device_manager.Timeout(1), device_manager.Timeout(1))
+            self.loop.run_until_complete(bluez.connect(bus, devman))
+            node = peers.Peers(devman, name, [f'127.0.0.1:{other}'], '127.0.0.1', port,
+                               interval=0.05, claim_delay=0.05)
+            self.loop.run_until_complete(node.start())
+            self.nodes.append((node, devman, bus))
+        self.settle()
+
+    def tearDown(self):
+        for node, _, _ in self.nodes:
+            node.stop()
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.loop.close()
+
+    def seen(self, index, rssi):
+        async def seen():
+            self.nodes[index][1].device_seen(self.address, rssi)
+        self.loop.run_until_complete(seen())
+
+    def settle(self, seconds=0.2):
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def test_discover_nodes(self):
+        self.assertEqual(self.nodes[0][0].get_stats()['nodes'], ['b'])
+        self.assertEqual(self.nodes[1][0].get_stats()['nodes'], ['a'])
+
+    def test_best_node_by_rssi(self):
+        self.seen(0, -80)
+        self.seen(1, -50)
+        self.settle()
+        self.assertEqual(self.nodes[0][0].best_node(self.address), 'b')
+        self.assertEqual(self.nodes[1][0].best_node(self.address), 'b')
+
+    def test_best_node_unheard(self):
+        self.assertEqual(self.nodes[0][0].best_node(self.address), 'a')
+        self.assertEqual(self.nodes[1][0].best_node(self.address), 'a')
+
+    def test_connect_forwards_to_best_node(self):
+        self.seen(0, -80)
+        self.seen(1, -50)
+        self.settle()
+        self.loop.run_until_complete(self.nodes[0][0].connect(self.address))
+        self.settle(0.5)
+        self.assertNotIn('pair', [e['value'] for e in self.nodes[0][1].get_journal()])
+        self.assertEqual(self.nodes[1][1].get_devices()[0]['state'], 'connected')
+        self.assertEqual(self.nodes[0][1].get_devices()[0]['state'], 'disconnected')
+        self.assertEqual(self.nodes[0][0].get_stats()['forwarded'], 1)
+
+    def test_aggregated_devices(self):
+        self.seen(1, -50)
+        self.loop.run_until_complete(self.nodes[1][0].connect(self.address))
+        self.settle()
+        device = self.nodes[0][0].get_devices()[0]
+        self.assertEqual(device['state'], 'connected')
+        self.assertTrue(device['in_range'])
+        self.assertEqual(device['owner'], 'b')
+        self.assertEqual(device['nodes']['a']['state'], 'disconnected')
+        self.assertEqual(device['nodes']['b'], {'state': 'connected', 'in_range': True, 'rssi': -50})
+
+    def test_lease_blocks_other_node(self):
+        self.seen(1, -50)
+        self.loop.run_until_complete(self.nodes[1][0].connect(self.address))
+        self.settle()
+        self.seen(0, -30)
+        self.settle()
+        self.assertEqual(self.nodes[0][0].best_node(self.address), 'b')
+        self.loop.run_until_complete(self.nodes[0][0].connect(self.address, forwarded=True))
+        self.assertEqual(self.nodes[0][1].get_devices()[0]['state'], 'disconnected')
+        self.assertEqual(self.nodes[0][0].get_stats()['lease_conflicts'], 1)
+
+    def test_simultaneous_claims(self):
+        async def claim_both():
+            return await asyncio.gather(self.nodes[0][0]._claim(self.address), self.nodes[1][0]._claim(self.address))
+        self.assertEqual(self.loop.run_until_complete(claim_both()), [True, False])
+
+    def test_disconnect_forwards_to_connected_node(self):
+        self.seen(1, -50)
+        self.loop.run_until_complete(self.nodes[1][0].connect(self.address))
+        self.settle()
+        self.loop.run_until_complete(self.nodes[0][0].disconnect(self.address))
+        self.settle()
+        self.assertEqual(self.nodes[1][1].get_devices()[0]['state'], 'disconnected')
+
+    def receive(self, message):
+        node = self.nodes[0][0]
+        node.datagram_received(json.dumps(message).encode() if isinstance(message, dict) else message,
+                               node._peer_addresses[0])
+
+    def test_invalid_datagram(self):
+        self.receive(b'not json')
+        self.receive({'type': 'connect', 'node': 'c', 'address': 'nope'})
+        self.receive({'type': 'connect', 'node': 'c', 'address': ['nope']})
+        self.receive({'type': 'disconnect', 'node': 'c', 'address': None})
+        self.assertEqual(self.nodes[0][0].get_stats()['invalid'], 4)
+
+    def test_invalid_node(self):
+        for node in [1, None, ['c']]:
+            self.receive({'type': 'state', 'node': node, 'devices': {}, 'leases': {}})
+        self.assertEqual(self.nodes[0][0].get_stats()['invalid'], 3)
+        self.assertEqual(self.nodes[0][0].best_node(self.address), 'a')
+
+    def test_invalid_state(self):
+        view = {'state': 'connected', 'in_range': True, 'rssi': -50}
+        for devices, leases in [({self.address: dict(view, state='paired')}, {}),
+                                ({self.address: dict(view, state=['connected'])}, {}),
+                                ({self.address: dict(view, in_range='yes')}, {}),
+                                ({self.address: dict(view, rssi='-50')}, {}),
+                                ({self.address: 'connected'}, {}),
+                                ([], {}),
+                                ({}, {self.address: 'forever'}),
+                                ({}, {self.address: True}),
+                                ({}, [self.address])]:
+            self.receive({'type': 'state', 'node': 'c', 'devices': devices, 'leases': leases})
+        self.assertEqual(self.nodes[0][0].get_stats()['invalid'], 9)
+        self.assertNotIn('c', self.nodes[0][0].get_stats()['nodes'])
+        self.assertEqual(self.nodes[0][0].best_node(self.address), 'a')
+
+    def test_valid_state_without_rssi(self):
+        self.receive({'type': 'state', 'node': 'c', 'leases': {},
+                      'devices': {self.address: {'state': 'connected', 'in_range': False, 'rssi': None}}})
+        self.assertEqual(self.nodes[0][0].get_stats()['invalid'], 0)
+        self.assertIn('c', self.nodes[0][0].get_stats()['nodes'])
+
+    def test_unknown_sender(self):
+        node = self.nodes[0][0]
+        node.datagram_received(b'{"type": "connect", "node": "c", "address": "00:11:22:33:44:55"}', ('127.0.0.1', 1))
+        self.assertEqual(node.get_stats()['unknown_senders'], 1)
+        self.assertEqual(node.get_stats()['forwarded'], 0)
+        self.assertEqual(self.nodes[0][1].get_devices()[0]['state'], 'disconnected')
+
+    def test_resolve_host_name(self):
+        node = peers.Peers(self.nodes[0][1], 'c', ['localhost:1'], '127.0.0.1', free_port())
+        self.loop.run_until_complete(node.start())
+        node.stop()
+        self.assertEqual(node._peer_addresses, [('127.0.0.1', 1)])
@@ -0,0 +1,67 @@
+import asyncio
+import pipeline
+import unittest
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.events = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def step(self, name, delay=0, error=None):
+        async def run():
+            self.events.append(('start', name))
+            await asyncio.sleep(delay)
+            if error:
+                raise error
+            self.events.append(('end', name))
+        return run
+
+    def run_steps(self, steps, on_start=None):
+        return self.loop.run_until_complete(pipeline.run(steps, on_start))
+
+    def test_independent_steps_overlap(self):
+        durations, elapsed = self.run_steps({
+            'pair': (self.step('pair', 0.05), []),
+            'trust': (self.step('trust', 0.05), []),
+            'connect': (self.step('connect'), ['pair', 'trust'])
+        })
+        self.assertEqual(self.events[:2], [('start', 'pair'), ('start', 'trust')])
+        self.assertEqual(self.events[-2:], [('start', 'connect'), ('end', 'connect')])
+        self.assertEqual(set(durations), {'pair', 'trust', 'connect'})
+        self.assertLess(elapsed, 0.09)
+        self.assertGreater(pipeline.saved(durations, elapsed), 0.02)
+
+    def test_on_start(self):
+        started = []
+        self.run_steps({
+            'a': (self.step('a'), []),
+            'b': (self.step('b'), ['a'])
+        }, started.append)
+        self.assertEqual(started, ['a', 'b'])
+
+    def test_failure_skips_dependents(self):
+        with self.assertRaises(RuntimeError):
+            self.run_steps({
+                'pair': (self.step('pair', error=RuntimeError('failed')), []),
+                'trust': (self.step('trust', 0.01), []),
+                'connect': (self.step('connect'), ['pair', 'trust'])
+            })
+        self.assertIn(('end', 'trust'), self.events)
+        self.assertNotIn(('start', 'connect'), self.events)
+
+    def test_first_error_raised(self):
+        first = RuntimeError('first')
+        with self.assertRaises(RuntimeError) as cm:
+            self.run_steps({
+                'a': (self.step('a', error=first), []),
+                'b': (self.step('b', 0.01, error=RuntimeError('second')), [])
+            })
+        self.assertIs(cm.exception, first)
+
+    def test_saved(self):
+        self.assertEqual(pipeline.saved({'a': 1, 'b': 1}, 1.5), 0.5)
+        self.assertEqual(pipeline.saved({'a': 1}, 1.2), 0)
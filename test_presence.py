@@ -0,0 +1,67 @@
+import asyncio
+import presence
+import unittest
+
+
+class PresenceTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.now = 100
+        self.changes = []
+        self.presence = presence.Presence(10, self.changes.append, lambda: self.now)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def seen(self, address, rssi=None):
+        async def seen():
+            self.presence.seen(address, rssi)
+        self.loop.run_until_complete(seen())
+
+    def test_unknown(self):
+        self.assertFalse(self.presence.is_present('addr'))
+        self.assertIsNone(self.presence.get('addr'))
+
+    def test_seen(self):
+        self.seen('addr', -60)
+        self.now += 4
+        self.assertTrue(self.presence.is_present('addr'))
+        self.assertEqual(self.presence.get('addr'), {'age': 4, 'rssi': -60, 'present': True})
+        self.assertEqual(self.changes, ['addr'])
+
+    def test_ttl(self):
+        self.seen('addr', -60)
+        self.now += 10
+        self.assertFalse(self.presence.is_present('addr'))
+
+    def test_keeps_last_rssi(self):
+        self.seen('addr', -60)
+        self.seen('addr')
+        self.assertEqual(self.presence.get('addr')['rssi'], -60)
+
+    def test_change_only_on_enter(self):
+        self.seen('addr', -60)
+        self.seen('addr', -50)
+        self.now += 20
+        self.seen('addr', -40)
+        self.assertEqual(self.changes, ['addr', 'addr'])
+
+    def test_expire(self):
+        self.seen('addr', -60)
+        self.now += 10
+        self.presence._expire('addr')
+        self.assertEqual(self.changes, ['addr', 'addr'])
+
+    def test_expire_rearms(self):
+        self.seen('addr', -60)
+        self.now += 5
+        self.seen('addr', -60)
+        self.now += 5
+        self.presence._expire('addr')
+        self.assertEqual(self.changes, ['addr'])
+        self.assertIn('addr', self.presence._timers)
+
+    def test_get_all(self):
+        self.seen('a', -60)
+        self.seen('b', -70)
+        self.assertEqual(set(self.presence.get_all()), {'a', 'b'})
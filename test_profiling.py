@@ -0,0 +1,73 @@
+import asyncio
+import profiling
+import time
+import unittest
+
+
+def block(seconds):
+    time.sleep(seconds)
+
+
+async def blocking_task():
+    block(0.03)
+
+
+class LoopMonitorTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.monitor = profiling.LoopMonitor(interval=0.01, slow_callback=0.02)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_monitored(self, callback):
+        async def run():
+            self.monitor.start()
+            try:
+                await asyncio.sleep(0.015)
+                callback()
+                await asyncio.sleep(0.05)
+                return self.monitor.get_stats()
+            finally:
+                self.monitor.stop()
+        return self.loop.run_until_complete(run())
+
+    def test_lag(self):
+        stats = self.run_monitored(lambda: block(0.03))
+        self.assertGreater(stats['lag_max'], 0.01)
+        self.assertEqual(stats['loop'], 'asyncio.unix_events')
+
+    def test_stall_attributed_to_task(self):
+        stats = self.run_monitored(lambda: asyncio.ensure_future(blocking_task()))
+        self.assertEqual(stats['stalls']['blocking_task']['count'], 1)
+        self.assertGreaterEqual(stats['stalls']['blocking_task']['max'], 0.02)
+
+    def test_stall_attributed_to_callback(self):
+        stats = self.run_monitored(lambda: asyncio.get_event_loop().call_soon(block, 0.03))
+        self.assertIn('block', stats['stalls'])
+
+    def test_stop_restores_handles(self):
+        original = asyncio.Handle._run
+        self.run_monitored(lambda: None)
+        self.assertIs(asyncio.Handle._run, original)
+
+
+class SamplingProfilerTest(unittest.TestCase):
+    def test_collapsed_stacks(self):
+        loop = asyncio.new_event_loop()
+        profiler = profiling.SamplingProfiler(interval=0.001)
+
+        async def run():
+            profile = asyncio.ensure_future(profiler.profile(0.05))
+            await asyncio.sleep(0)
+            self.assertTrue(profiler.busy())
+            block(0.03)
+            return await profile
+
+        stacks = loop.run_until_complete(run())
+        loop.close()
+        lines = stacks.splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any('block (' in line for line in lines))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
@@ -0,0 +1,191 @@
+import async_mock
+import asyncio
+import device_manager
+import reconnect
+import unittest
+
+
+class ReconnectTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.address = '00:11:22:33:44:55'
+        self.backoff = MockBackoff()
+        self.scan_timeout = MockTimeout()
+        self.devman = device_manager.DeviceManager([
+            {
+                'name': 'Watched',
+                'address': self.address,
+                'reconnect': True
+            },
+            {
+                'name': 'Unwatched',
+                'address': '66:77:88:99:AA:BB'
+            }
+        ], MockTimeout(), self.scan_timeout, self.backoff)
+        self.adapter = MockAdapter()
+        self.devman.add_adapter(self.adapter)
+        self.device = MockDevice()
+        self.devman.add_device(self.address, self.device, True)
+
+    def run_tasks(self):
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+
+    def stats(self):
+        return self.devman.get_stats()['reconnect'][self.address]
+
+    def test_reconnect_after_drop(self):
+        self.device.connect.side_effect = [lambda *_: self.devman.update_device(self.address, True)]
+        self.devman.update_device(self.address, False)
+        self.run_tasks()
+        self.assertEqual(self.device.calls, ['connect'])
+        self.assertEqual(self.backoff.attempts, [0])
+        self.assertEqual(self.devman.get_devices()[0]['state'], 'connected')
+        stats = self.stats()
+        self.assertEqual(stats['drops'], 1)
+        self.assertEqual(stats['attempts'], 1)
+        self.assertEqual(stats['reconnects'], 1)
+        self.assertEqual(stats['escalations'], 0)
+        self.assertIsNotNone(stats['last_latency'])
+
+    def test_backoff_then_escalate(self):
+        self.device.connect.side_effect = [fail, fail, fail]
+        self.devman.update_device(self.address, False)
+        self.run_tasks()
+        self.assertEqual(self.backoff.attempts, [0, 1, 2])
+        self.assertEqual(self.device.calls, ['connect', 'connect', 'connect', 'pair', 'trust', 'connect'])
+        self.assertIn(('remove_device', [self.device]), self.adapter.calls)
+        stats = self.stats()
+        self.assertEqual(stats['attempts'], 3)
+        self.assertEqual(stats['reconnects'], 0)
+        self.assertEqual(stats['escalations'], 1)
+
+    def test_rediscover_forgotten_device(self):
+        device = MockDevice()
+        device.connect.side_effect = [lambda *_: self.devman.update_device(self.address, True)]
+        self.scan_timeout.wait_event.side_effect = [lambda *_: self.devman.add_device(self.address, device, False)]
+        self.devman.update_device(self.address, False)
+        self.devman.remove_device(self.address)
+        self.run_tasks()
+        self.assertEqual(device.calls, ['connect'])
+        self.assertEqual(self.stats()['reconnects'], 1)
+
+    def test_escalation_failure_counted(self):
+        self.device.connect.side_effect = [fail, fail, fail, fail]
+        self.devman.update_device(self.address, False)
+        with self.assertLogs('reconnect'):
+            self.run_tasks()
+        stats = self.stats()
+        self.assertEqual(stats['escalations'], 1)
+        self.assertEqual(stats['escalation_failures'], 1)
+        self.assertFalse(self.devman._supervisor.is_reconnecting(self.address))
+
+    def test_user_disconnect_cancels_escalation(self):
+        self.device.connect.side_effect = [fail, fail, fail]
+        self.scan_timeout.wait_event.side_effect = [asyncio.sleep(1)]
+        self.devman.update_device(self.address, False)
+        self.run_tasks()
+        self.assertTrue(self.devman._supervisor.is_reconnecting(self.address))
+        self.loop.run_until_complete(self.devman.disconnect(self.address))
+        self.run_tasks()
+        self.assertFalse(self.devman._supervisor.is_reconnecting(self.address))
+        self.assertEqual(self.device.calls, ['connect', 'connect', 'connect'])
+        self.assertEqual(self.devman.get_devices()[0]['state'], 'disconnected')
+        self.assertIn('aborted', [e['value'] for e in self.devman.get_journal()])
+
+    def test_user_connect_replaces_escalation(self):
+        self.device.connect.side_effect = [fail, fail, fail, lambda *_: self.devman.update_device(self.address, True)]
+        self.scan_timeout.wait_event.side_effect = [asyncio.sleep(1)]
+        self.devman.update_device(self.address, False)
+        self.run_tasks()
+        self.assertTrue(self.devman._supervisor.is_reconnecting(self.address))
+        self.loop.run_until_complete(self.devman.connect(self.address))
+        self.run_tasks()
+        self.assertFalse(self.devman._supervisor.is_reconnecting(self.address))
+        self.assertEqual(self.device.calls, ['connect', 'connect', 'connect', 'pair', 'trust', 'connect'])
+        self.assertEqual(self.devman.get_devices()[0]['state'], 'connected')
+
+    def test_ignore_user_disconnect(self):
+        self.loop.run_until_complete(self.devman.disconnect(self.address))
+        self.devman.update_device(self.address, False)
+        self.run_tasks()
+        self.assertEqual(self.device.calls, ['disconnect'])
+        self.assertEqual(self.devman.get_stats()['reconnect'], {})
+
+    def test_ignore_unwatched_device(self):
+        device = MockDevice()
+        self.devman.add_device('66:77:88:99:AA:BB', device, True)
+        self.devman.update_device('66:77:88:99:AA:BB', False)
+        self.run_tasks()
+        self.assertEqual(device.calls, [])
+
+    def test_user_connect_cancels_reconnect(self):
+        self.backoff.sleep.side_effect = [asyncio.sleep(1)]
+        self.devman.update_device(self.address, False)
+        self.loop.run_until_complete(self.devman.connect(self.address))
+        self.run_tasks()
+        self.assertEqual(self.backoff.attempts, [0])
+        self.assertEqual(self.device.calls, ['pair', 'trust', 'connect'])
+        self.assertEqual(self.stats()['attempts'], 0)
+
+
+class BackoffTest(unittest.TestCase):
+    def test_delay_grows_with_jitter(self):
+        backoff = reconnect.Backoff(initial=1, maximum=10, factor=2)
+        for attempt, delay in [(0, 1), (1, 2), (2, 4), (3, 8), (4, 10), (10, 10)]:
+            for _ in range(20):
+                self.assertGreaterEqual(backoff.delay(attempt), delay / 2)
+                self.assertLessEqual(backoff.delay(attempt), delay)
+
+
+def fail(*_):
+    raise RuntimeError('org.bluez.Error.Failed: Page Timeout')
+
+
+class MockBackoff:
+    def __init__(self):
+        self.attempts = []
+
+    @async_mock.async_mock_method
+    async def sleep(self, attempt):
+        self.attempts.append(attempt)
+
+
+class MockAdapter:
+    def __init__(self):
+        self.calls = []
+
+    async def remove_device(self, device):
+        self.calls.append(('remove_device', [device]))
+
+    async def set_discovery_filter(self, filter={}):
+        self.calls.append(('set_discovery_filter', [filter]))
+
+    async def start_discovery(self):
+        self.calls.append(('start_discovery', []))
+
+    async def stop_discovery(self):
+        self.calls.append(('stop_discovery', []))
+
+
+class MockDevice:
+    def __init__(self):
+        self.calls = []
+
+    async def pair(self):
+        self.calls.append('pair')
+
+    @async_mock.async_mock_method
+    async def connect(self):
+        self.calls.append('connect')
+
+    async def disconnect(self):
+        self.calls.append('disconnect')
+
+    async def trust(self):
+        self.calls.append('trust')
+
+
+class MockTimeout:
+    @async_mock.async_mock_method
+    async def wait_event(self, event):
+        pass
@@ -0,0 +1,89 @@
+import json
+import unittest
+import wire
+
+
+def devices(*states, count=None):
+    states = list(states) or ['disconnected'] * count
+    return [{'name': f'Device {i}', 'address': f'00:11:22:33:{i // 256:02X}:{i % 256:02X}',
+             'state': state, 'in_range': False} for i, state in enumerate(states)]
+
+
+class WireTest(unittest.TestCase):
+    def test_select_subprotocol(self):
+        self.assertEqual(wire.select_subprotocol(None, ['bluerepair.json', 'bluerepair.binary']), wire.BINARY)
+        self.assertEqual(wire.select_subprotocol(None, ['bluerepair.json']), wire.JSON)
+        self.assertIsNone(wire.select_subprotocol(None, []))
+        self.assertIsNone(wire.select_subprotocol(None, ['other']))
+
+    def test_encoder(self):
+        self.assertIsInstance(wire.encoder(wire.BINARY), wire.BinaryEncoder)
+        self.assertIsInstance(wire.encoder(wire.JSON), wire.JsonEncoder)
+        self.assertIsInstance(wire.encoder(None), wire.JsonEncoder)
+
+    def test_json(self):
+        encoder = wire.JsonEncoder()
+        first = devices('disconnected', 'connected')
+        second = devices('connecting', 'connected')
+        self.assertEqual(json.loads(encoder.encode(first)), first)
+        self.assertEqual(json.loads(encoder.encode(second)), {'changed': [second[0]]})
+        self.assertIsNone(encoder.encode(second))
+
+    def test_binary_round_trip(self):
+        encoder = wire.BinaryEncoder()
+        decoder = wire.Decoder()
+        first = devices('disconnected', 'connected')
+        second = devices('connecting', 'connected')
+        second[1]['in_range'] = True
+        self.assertEqual(decoder.decode(encoder.encode(first)), first)
+        self.assertEqual(decoder.decode(encoder.encode(second)), {'changed': second})
+
+    def test_binary_update_size(self):
+        encoder = wire.BinaryEncoder()
+        encoder.encode(devices('disconnected', 'connected'))
+        frame = encoder.encode(devices('connecting', 'connected'))
+        self.assertEqual(frame, bytes([wire.UPDATE, 0, 1]))
+
+    def test_binary_in_range(self):
+        encoder = wire.BinaryEncoder()
+        encoder.encode(devices('connected'))
+        changed = devices('connected')
+        changed[0]['in_range'] = True
+        self.assertEqual(encoder.encode(changed), bytes([wire.UPDATE, 0, 2 | wire.IN_RANGE]))
+
+    def test_binary_unchanged(self):
+        encoder = wire.BinaryEncoder()
+        encoder.encode(devices('connected'))
+        self.assertIsNone(encoder.encode(devices('connected')))
+
+    def test_binary_new_dictionary(self):
+        encoder = wire.BinaryEncoder()
+        decoder = wire.Decoder()
+        decoder.decode(encoder.encode(devices('connected')))
+        renamed = devices('connected')
+        renamed[0]['name'] = 'Renamed'
+        self.assertEqual(decoder.decode(encoder.encode(renamed)), renamed)
+        more = devices('connected', 'disconnected')
+        self.assertEqual(decoder.decode(encoder.encode(more)), more)
+
+    def test_binary_wide_ids(self):
+        encoder = wire.BinaryEncoder()
+        decoder = wire.Decoder()
+        first = devices(count=300)
+        decoder.decode(encoder.encode(first))
+        second = devices(count=300)
+        second[299]['state'] = 'connected'
+        frame = encoder.encode(second)
+        self.assertEqual(len(frame), 4)
+        self.assertEqual(decoder.decode(frame), {'changed': [second[299]]})
+
+    def test_binary_unicode_name(self):
+        encoder = wire.BinaryEncoder()
+        decoder = wire.Decoder()
+        first = devices('connected')
+        first[0]['name'] = 'Manette de Zoë'
+        self.assertEqual(decoder.decode(encoder.encode(first)), first)
+
+    def test_unknown_frame(self):
+        with self.assertRaises(ValueError):
+            wire.Decoder().decode(bytes([7]))
@@ -0,0 +1,133 @@
+import json
+import struct
+
+# Websocket clients pick an encoding for the device stream by subprotocol.
+# Clients that ask for none get JSON text, as before.
+#
+# bluerepair.binary frames start with a type byte. A dictionary frame lists
+# every device and numbers them in order:
+#
+#     0x00, u16 count, then per device: status, u8 length, address,
+#     u8 length, name
+#
+# An update frame carries only the devices whose status changed, by number,
+# one byte each when there are at most 256 devices and two otherwise:
+#
+#     0x01, then per device: id, status
+#
+# status is the state code in the low bits, with 0x80 set when the device is
+# in range. A new dictionary frame is sent whenever anything else changes.
+
+JSON = 'bluerepair.json'
+BINARY = 'bluerepair.binary'
+SUBPROTOCOLS = [BINARY, JSON]
+
+STATES = ['disconnected', 'connecting', 'connected', 'disconnecting']
+IN_RANGE = 0x80
+DICTIONARY = 0
+UPDATE = 1
+
+_STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+
+def select_subprotocol(_, offered):
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in offered:
+            return subprotocol
+    return None
+
+
+def encoder(subprotocol):
+    return BinaryEncoder() if subprotocol == BINARY else JsonEncoder()
+
+
+def delta(previous, devices):
+    if previous is None or [d['address'] for d in previous] != [d['address'] for d in devices]:
+        return devices
+    changed = [d for d, p in zip(devices, previous) if d != p]
+    return {'changed': changed} if changed else None
+
+
+class JsonEncoder:
+    def __init__(self):
+        self._previous = None
+
+    def encode(self, devices):
+        message = delta(self._previous, devices)
+        self._previous = devices
+        return json.dumps(message) if message else None
+
+
+class BinaryEncoder:
+    def __init__(self):
+        self._previous = None
+
+    def encode(self, devices):
+        previous = self._previous
+        self._previous = devices
+        if previous is None or len(previous) != len(devices):
+            return self._dictionary(devices)
+        changed = []
+        for i, (device, old) in enumerate(zip(devices, previous)):
+            if device == old:
+                continue
+            if device['address'] != old['address'] or device['name'] != old['name']:
+                return self._dictionary(devices)
+            changed.append((i, _status(device)))
+        if not changed:
+            return None
+        return self._update(changed, 'B' if len(devices) <= 256 else 'H')
+
+    def _dictionary(self, devices):
+        frame = bytearray(struct.pack('>BH', DICTIONARY, len(devices)))
+        for device in devices:
+            address = device['address'].encode()
+            name = device['name'].encode()[:255]
+            frame += struct.pack('>BB', _status(device), len(address)) + address
+            frame += struct.pack('>B', len(name)) + name
+        return bytes(frame)
+
+    def _update(self, changed, id_format):
+        frame = bytearray([UPDATE])
+        for i, status in changed:
+            frame += struct.pack(f'>{id_format}B', i, status)
+        return bytes(frame)
+
+
+class Decoder:
+    def __init__(self):
+        self._devices = []
+
+    def decode(self, frame):
+        kind = frame[0]
+        if kind == DICTIONARY:
+            count, = struct.unpack_from('>H', frame, 1)
+            offset = 3
+            self._devices = []
+            for _ in range(count):
+                status, length = struct.unpack_from('>BB', frame, offset)
+                offset += 2
+                address = frame[offset:offset + length].decode()
+                offset += length
+                length = frame[offset]
+                name = frame[offset + 1:offset + 1 + length].decode(errors='replace')
+                offset += 1 + length
+                self._devices.append(dict({'name': name, 'address': address}, **_from_status(status)))
+            return [dict(d) for d in self._devices]
+        if kind == UPDATE:
+            id_size = 1 if len(self._devices) <= 256 else 2
+            changed = []
+            for offset in range(1, len(frame), id_size + 1):
+                i = int.from_bytes(frame[offset:offset + id_size], 'big')
+                self._devices[i].update(_from_status(frame[offset + id_size]))
+                changed.append(dict(self._devices[i]))
+            return {'changed': changed}
+        raise ValueError(f'unknown frame type {kind}')
+
+
+def _status(device):
+    return _STATE_CODES[device['state']] | (IN_RANGE if device.get('in_range') else 0)
+
+
+def _from_status(status):
+    return {'state': STATES[status & ~IN_RANGE], 'in_range': bool(status & IN_RANGE)}